@@ -3,8 +3,66 @@
 """
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple, Union
+
+from report_index import ReportIndex
+from report_query import ConditionLike, as_condition, plan_query
+from report_storage import StorageBackend, create_storage
+
+
+def _copy_report(value: Any) -> Any:
+    """复制报告数据（只复制dict/list容器，比deepcopy快得多）"""
+    if isinstance(value, dict):
+        return {k: _copy_report(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_report(v) for v in value]
+    return value
+
+
+def _normalize_filters(filters: Optional[Dict]) -> str:
+    """将列表过滤条件规范化为缓存键（忽略空条件，全文关键词按搜索语义小写并合并空白）"""
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if not value:
+            continue
+        if key == "text":
+            value = " ".join(str(value).lower().split())
+        normalized[key] = value
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _as_date_folder(value: Union[str, date, None]) -> Optional[str]:
+    """将日期参数转换为日期文件夹名（YYYY-MM-DD）"""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value).replace("/", "-")
+
+
+class ReportRow(dict):
+    """
+    报告列表行 - 元数据（file_path, patient_id, name, exam_time 等）即时可用，
+    报告内容通过 load() 或 row['data'] 按需加载（经由DataManager的LRU缓存，不常驻内存）
+    """
+
+    def __init__(self, row: Dict, loader):
+        super().__init__(row)
+        self._loader = loader
+
+    def load(self) -> Optional[Dict]:
+        """加载报告内容"""
+        return self._loader(self["file_path"])
+
+    def __missing__(self, key):
+        if key == "data":
+            return self.load()
+        raise KeyError(key)
 
 
 class DataManager:
@@ -24,6 +82,26 @@ class DataManager:
         # “检查所见”自动汇总规则与空值配置（懒加载，由JSON完全驱动）
         self._exam_findings_rules: Optional[Dict[str, List[str]]] = None
         self._exam_findings_empty_values: Optional[List[str]] = None
+        # 二级索引字段（懒加载，来自 pages/basic_info.json 中标记 "indexed": true 的字段）
+        self._indexed_fields: Optional[List[str]] = None
+        # 报告存储后端（懒加载，由 config["database"]["storage"] 选择，索引首次列表时构建）
+        self._storage: Optional[StorageBackend] = None
+        # 存储的创建与索引的构建/对账可能同时来自界面线程与后台加载线程
+        self._storage_lock = threading.RLock()
+        # 本次运行是否已做过一次全量指纹对账（用于发现程序外原地修改的文件）
+        self._index_fully_reconciled = False
+        # 已解析报告的LRU缓存：file_path -> ((mtime_ns, size), data)
+        self._report_cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict]]" = OrderedDict()
+        self._report_cache_size = int(config.get("database", {}).get("report_cache_size", 64))
+        self._report_cache_lock = threading.Lock()
+        # 查询结果缓存：规范化的查询 -> (索引行或计数)；任何报告变化（保存、删除、对账发现的外部修改）时整体失效
+        self._query_cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._query_cache_size = int(config.get("database", {}).get("query_cache_size", 32))
+        self._query_cache_lock = threading.Lock()
+        self._query_cache_generation = 0
+        # 与磁盘对账的最小间隔：间隔内的重复查询直接由缓存返回，不访问磁盘
+        self._reconcile_interval = float(config.get("database", {}).get("reconcile_interval_seconds", 10))
+        self._last_reconcile: Optional[float] = None
     
     def get_basic_info_page_id(self, load_page_config_func) -> str:
         """
@@ -101,6 +179,31 @@ class DataManager:
         
         return "ID"
     
+    def get_indexed_fields(self) -> List[str]:
+        """
+        获取二级索引字段：pages/basic_info.json 中标记了 "indexed": true 的字段key
+        （索引字段变化后，下次列表时会自动重建索引）
+        
+        Returns:
+            字段key列表
+        """
+        if self._indexed_fields is not None:
+            return self._indexed_fields
+        
+        fields: List[str] = []
+        config_path = os.path.join(os.path.dirname(__file__), "pages", "basic_info.json")
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                page_config = json.load(f)
+            for section in page_config.get("sections", []):
+                for field in section.get("fields", []):
+                    if field.get("indexed") and field.get("key"):
+                        fields.append(str(field["key"]))
+        except Exception as e:
+            print(f"读取索引字段配置失败: {e}")
+        self._indexed_fields = fields
+        return fields
+    
     def _load_exam_findings_rules(self) -> Dict[str, List[str]]:
         """
         加载“检查所见”自动汇总规则：
@@ -264,8 +367,7 @@ class DataManager:
         # 如果指定了文件路径，直接保存（编辑现有文件）
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                self._write_report(file_path, data)
                 return True, file_path
             except Exception as e:
                 return False, f"保存失败: {str(e)}"
@@ -309,45 +411,92 @@ class DataManager:
             # 忽略自动补全失败，不影响保存
             pass
         
-        # 创建日期文件夹
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        report_folder = os.path.join(self.db_path, "report", current_date)
-        if not os.path.exists(report_folder):
-            os.makedirs(report_folder, exist_ok=True)
-        
         # 获取患者ID
+        current_date = datetime.now().strftime("%Y-%m-%d")
         patient_id_key = self.get_patient_id_key(load_page_config_func)
         patient_id = basic_info.get(patient_id_key, "unknown")
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{patient_id}_{timestamp}.json"
         
-        # 完整的文件路径
-        file_path = os.path.join(report_folder, filename)
-        
-        # 保存数据到文件
+        # 保存数据（报告键为 日期文件夹/文件名 形式的路径，由存储后端创建日期文件夹）
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            file_path = self._get_storage().new_key(current_date, filename)
+            self._write_report(file_path, data)
             return True, file_path
         except Exception as e:
             return False, f"保存失败: {str(e)}"
     
+    def _read_report_file(self, file_path: str) -> Optional[Dict]:
+        """直接从存储后端解析报告（不经过缓存）"""
+        return self._get_storage().read(file_path)
+    
+    def batch_writes(self):
+        """
+        批量保存上下文：批次内的报告统一在退出时刷盘，索引分段提交（批量导入时使用）
+
+        用法：
+            with data_manager.batch_writes():
+                for data in reports:
+                    data_manager.save_report(data)
+        """
+        return self._get_storage().batch()
+
+    def _write_report(self, file_path: str, data: Dict):
+        """写入报告并同步更新索引、缓存"""
+        storage = self._get_storage()
+        basic_info_key = storage.index.get_meta("basic_info_key") or "基本信息"
+        storage.write(file_path, data, self.extract_index_metadata(data, basic_info_key))
+        storage.batch_checkpoint()
+        self._evict_cached_report(file_path)
+        self._invalidate_query_cache()
+    
     def load_report(self, file_path: str) -> Optional[Dict]:
         """
-        加载报告数据
+        加载报告数据（经由按 (路径, mtime, size) 校验的LRU缓存）
         
         Args:
-            file_path: JSON文件路径
+            file_path: 报告文件路径（报告键）
             
         Returns:
-            报告数据字典，如果加载失败返回None
+            报告数据字典（调用方可自由修改的副本），如果加载失败返回None
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"加载报告失败 {file_path}: {e}")
+        fingerprint = self._get_storage().fingerprint(file_path)
+        if fingerprint is None:
+            print(f"加载报告失败 {file_path}: 报告不存在")
             return None
+        
+        with self._report_cache_lock:
+            cached = self._report_cache.get(file_path)
+            if cached is not None and cached[0] == fingerprint:
+                self._report_cache.move_to_end(file_path)
+                return _copy_report(cached[1])
+        
+        data = self._read_report_file(file_path)
+        if data is None or self._report_cache_size <= 0:
+            return data
+        with self._report_cache_lock:
+            self._report_cache[file_path] = (fingerprint, data)
+            self._report_cache.move_to_end(file_path)
+            while len(self._report_cache) > self._report_cache_size:
+                self._report_cache.popitem(last=False)
+        return _copy_report(data)
+    
+    def _evict_cached_report(self, file_path: str):
+        """报告被修改或删除时移出缓存"""
+        with self._report_cache_lock:
+            self._report_cache.pop(file_path, None)
+    
+    def report_exists(self, file_path: str) -> bool:
+        """
+        报告是否存在
+        
+        Args:
+            file_path: 报告文件路径（报告键）
+            
+        Returns:
+            是否存在
+        """
+        return self._get_storage().exists(file_path)
     
     def delete_report(self, file_path: str) -> Tuple[bool, str]:
         """
@@ -359,98 +508,362 @@ class DataManager:
         Returns:
             (是否成功, 消息)
         """
-        if not os.path.exists(file_path):
+        storage = self._get_storage()
+        if not storage.exists(file_path):
             return False, "报告文件不存在"
         
         try:
-            os.remove(file_path)
+            storage.remove(file_path)
+            self._evict_cached_report(file_path)
+            self._invalidate_query_cache()
             return True, "报告已删除"
         except Exception as e:
             return False, f"删除失败: {str(e)}"
     
-    def list_reports(self, basic_info_key: str = "基本信息") -> List[Dict]:
+    def _get_storage(self) -> StorageBackend:
+        """获取报告存储后端（懒加载）"""
+        with self._storage_lock:
+            if self._storage is None:
+                self._storage = create_storage(self.db_path, self.config)
+            return self._storage
+
+    def _get_report_index(self) -> ReportIndex:
+        """获取报告索引"""
+        return self._get_storage().index
+
+    def extract_index_metadata(self, data: Dict, basic_info_key: str = "基本信息",
+                               with_text: bool = True) -> Dict[str, str]:
         """
-        列出所有报告
+        从报告数据中提取列表所需的元数据（及全文检索文本）
         
         Args:
+            data: 报告数据
             basic_info_key: 基本信息在JSON中的key
+            with_text: 是否生成全文检索文本
             
         Returns:
-            报告列表，每个报告包含 file_path, patient_id, name, exam_time, data
-        """
-        reports = []
-        report_folder = os.path.join(self.db_path, "report")
-        
-        if not os.path.exists(report_folder):
-            return reports
-        
-        # 遍历所有日期文件夹（先收集，再按检查时间排序，最新在上）
-        for date_folder in os.listdir(report_folder):
-            date_path = os.path.join(report_folder, date_folder)
-            if os.path.isdir(date_path):
-                for report_file in os.listdir(date_path):
-                    if report_file.endswith('.json'):
-                        file_path = os.path.join(date_path, report_file)
-                        data = self.load_report(file_path)
-                        if data:
-                            basic_info = data.get(basic_info_key, {})
-                            reports.append({
-                                'file_path': file_path,
-                                'patient_id': basic_info.get("ID", "未知"),
-                                'name': basic_info.get("姓名", "未知"),
-                                'exam_time': basic_info.get("检查时间", "未知"),
-                                'data': data
-                            })
-        
-        def _parse_exam_time(r: Dict) -> float:
-            """
-            仅根据文件名里的时间戳排序（患者ID_YYYYMMDD_HHMMSS.json），精确到秒；
-            解析失败时退回文件修改时间。
-            """
-            file_path = r.get("file_path", "")
-            # 从文件名中解析 patientID_YYYYMMDD_HHMMSS.json
-            try:
-                base = os.path.basename(file_path)
-                name, _ = os.path.splitext(base)
-                parts = name.split("_")
-                if len(parts) >= 2:
-                    ts = parts[-1]  # YYYYMMDD_HHMMSS
-                    dt = datetime.strptime(ts, "%Y%m%d_%H%M%S")
-                    return dt.timestamp()
-            except Exception:
-                pass
-
-            # 退回文件修改时间
-            try:
-                return os.path.getmtime(file_path)
-            except Exception:
-                return 0.0
+            元数据字典，包含 patient_id, name, exam_time, fields（二级索引字段值）（以及 text）
+        """
+        basic_info = data.get(basic_info_key, {})
+        if not isinstance(basic_info, dict):
+            basic_info = {}
+        metadata = {
+            "patient_id": str(basic_info.get("ID", "未知")),
+            "name": str(basic_info.get("姓名", "未知")),
+            "exam_time": str(basic_info.get("检查时间", "未知")),
+            "fields": {
+                field: self._index_field_values(basic_info.get(field, ""))
+                for field in self.get_indexed_fields()
+            },
+        }
+        if with_text:
+            metadata["text"] = "\n".join(self._iter_report_text(data))
+        return metadata
 
-        # 按检查时间从新到旧排序
-        reports.sort(key=_parse_exam_time, reverse=True)
-        return reports
+    def _index_field_values(self, value: Any) -> List[str]:
+        """二级索引字段的索引值：多选字段每个选项一个值，空值不入索引"""
+        values = value if isinstance(value, list) else [value]
+        return [str(v) for v in values if v not in ("", None)]
     
-    def search_reports(self, search_text: str, basic_info_key: str = "基本信息") -> List[Dict]:
+    def index_meta(self, basic_info_key: str = "基本信息") -> Dict[str, str]:
         """
-        搜索报告
+        索引内容所依赖的配置（任一变化都需要重建索引）
         
         Args:
-            search_text: 搜索关键词
             basic_info_key: 基本信息在JSON中的key
             
         Returns:
-            匹配的报告列表
+            {元信息key: 值}
+        """
+        return {
+            "basic_info_key": basic_info_key,
+            "indexed_fields": json.dumps(self.get_indexed_fields(), ensure_ascii=False),
+        }
+    
+    def _iter_report_text(self, value: Any):
+        """递归遍历报告，产出所有非空的叶子值文本"""
+        if isinstance(value, dict):
+            for item in value.values():
+                yield from self._iter_report_text(item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from self._iter_report_text(item)
+        elif value not in ("", None):
+            yield str(value)
+
+    def _ensure_report_index(self, basic_info_key: str, reconcile: bool = True) -> ReportIndex:
         """
-        all_reports = self.list_reports(basic_info_key)
-        search_text_lower = search_text.lower()
+        确保索引已构建、与当前基本信息key及索引字段一致，并与存储增量对账
+        （每次运行的首次对账逐个比对文件指纹，以发现程序外原地修改的报告）
         
-        filtered_reports = []
-        for report in all_reports:
-            if (search_text_lower in report['patient_id'].lower() or
-                search_text_lower in report['name'].lower() or
-                search_text_lower in report['exam_time'].lower() or
-                search_text_lower in report['file_path'].lower()):
-                filtered_reports.append(report)
+        Args:
+            basic_info_key: 基本信息在JSON中的key
+            reconcile: 索引已存在时是否与存储对账
+        """
+        storage = self._get_storage()
+        index = storage.index
+        extract = partial(self.extract_index_metadata, basic_info_key=basic_info_key)
+        index_meta = self.index_meta(basic_info_key)
+        with self._storage_lock:
+            if not index.is_built() or any(index.get_meta(k) != v for k, v in index_meta.items()):
+                for key, value in index_meta.items():
+                    index.set_meta(key, value)
+                storage.rebuild_index(extract)
+                self._index_fully_reconciled = True
+                self._last_reconcile = time.monotonic()
+                self._invalidate_query_cache()
+            elif reconcile and self._reconcile_due():
+                changed = storage.sync_index(extract, full=not self._index_fully_reconciled)
+                self._index_fully_reconciled = True
+                self._last_reconcile = time.monotonic()
+                if changed:
+                    self._invalidate_query_cache()
+        return index
+    
+    def _reconcile_due(self) -> bool:
+        """距上次对账是否已超过 reconcile_interval_seconds（本次运行首次对账总是执行）"""
+        if not self._index_fully_reconciled or self._last_reconcile is None:
+            return True
+        return time.monotonic() - self._last_reconcile >= self._reconcile_interval
+    
+    def mark_index_stale(self):
+        """
+        要求下次列表/查询时立即与磁盘做一次完整对账（如用户点击刷新，可能有程序外的修改）；
+        原地修改报告文件不会改变日期文件夹的mtime，因此不能只按文件夹mtime跳过
+        """
+        self._index_fully_reconciled = False
+        self._last_reconcile = None
+    
+    def _invalidate_query_cache(self):
+        """报告发生变化，丢弃全部查询结果缓存"""
+        with self._query_cache_lock:
+            self._query_cache_generation += 1
+            self._query_cache.clear()
+    
+    def _cached_query(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """
+        按规范化的查询键返回缓存结果，未命中时计算并缓存
+        （计算期间缓存失效的结果不写入缓存，避免缓存过期数据）
         
-        return filtered_reports
+        Args:
+            key: 查询键
+            compute: 计算查询结果的函数（返回索引行列表、分页结果或计数，调用方不得修改）
+        """
+        with self._query_cache_lock:
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key]
+            generation = self._query_cache_generation
+        value = compute()
+        if self._query_cache_size <= 0:
+            return value
+        with self._query_cache_lock:
+            if generation == self._query_cache_generation:
+                self._query_cache[key] = value
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return value
+
+    def _wrap_rows(self, rows: List[Dict]) -> List[ReportRow]:
+        """为索引行附加按需加载报告内容的句柄"""
+        return [ReportRow(row, self.load_report) for row in rows]
 
+    def list_reports(self, basic_info_key: str = "基本信息") -> List[Dict]:
+        """
+        列出所有报告（从索引读取，不解析报告内容）
+        
+        Args:
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            报告列表（按文件名时间戳从新到旧），每个报告包含 file_path, patient_id, name, exam_time，
+            报告内容通过 ReportRow.load() 按需加载
+        """
+        index = self._ensure_report_index(basic_info_key)
+        return self._wrap_rows(self._cached_query(("list", basic_info_key), index.list_rows))
+    
+    def iter_reports(self, since: Union[str, date, None] = None, until: Union[str, date, None] = None,
+                     predicate: Optional[Callable[[Dict], bool]] = None,
+                     basic_info_key: str = "基本信息") -> Iterator[Dict]:
+        """
+        流式遍历报告：按日期分区从旧到新逐个解析并产出，内存占用与数据库大小无关
+        （不经过报告缓存；调用方可随时停止迭代）
+        
+        Args:
+            since: 起始日期（含），YYYY-MM-DD 字符串或 date/datetime，按日期文件夹过滤
+            until: 结束日期（含），同上
+            predicate: 过滤函数，接收报告数据，返回True时产出
+            basic_info_key: 基本信息在JSON中的key
+            
+        Yields:
+            报告字典，包含 file_path, patient_id, name, exam_time, date_folder, data
+        """
+        for file_path, date_folder, data in self._get_storage().iterate(
+            _as_date_folder(since), _as_date_folder(until)
+        ):
+            if predicate is not None and not predicate(data):
+                continue
+            metadata = self.extract_index_metadata(data, basic_info_key, with_text=False)
+            yield {
+                "file_path": file_path,
+                "patient_id": metadata["patient_id"],
+                "name": metadata["name"],
+                "exam_time": metadata["exam_time"],
+                "date_folder": date_folder,
+                "data": data,
+            }
+    
+    def list_reports_page(self, cursor: Optional[str] = None, limit: int = 50,
+                          filters: Optional[Dict] = None,
+                          basic_info_key: str = "基本信息") -> Dict:
+        """
+        分页列出报告（按文件名时间戳从新到旧，只返回轻量行）
+        
+        Args:
+            cursor: 上一页返回的 next_cursor，首页传None（首页会先与磁盘增量对账）
+            limit: 每页条数
+            filters: 过滤条件，支持 patient_id、date_from/date_to（YYYY-MM-DD）、
+                     fields（二级索引字段等值过滤，如 {"检查医生": "赵敏"}）、text（全文搜索）
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            {"rows": 报告列表, "next_cursor": 下一页游标（无更多数据时为None）}
+        """
+        index = self._ensure_report_index(basic_info_key, reconcile=cursor is None)
+        page = self._cached_query(
+            ("page", basic_info_key, cursor, limit, _normalize_filters(filters)),
+            lambda: index.list_page(cursor, limit, filters)
+        )
+        return {"rows": self._wrap_rows(page["rows"]), "next_cursor": page["next_cursor"]}
+    
+    def count_reports(self, filters: Optional[Dict] = None, basic_info_key: str = "基本信息") -> int:
+        """
+        统计报告数量（只读索引）
+        
+        Args:
+            filters: 过滤条件，同 list_reports_page
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            报告数量
+        """
+        index = self._ensure_report_index(basic_info_key, reconcile=False)
+        return self._cached_query(
+            ("count", basic_info_key, _normalize_filters(filters)), lambda: index.count(filters)
+        )
+    
+    def patient_timeline(self, patient_id: str, basic_info_key: str = "基本信息") -> List[ReportRow]:
+        """
+        获取患者的历次报告（按时间从旧到新，直接读取患者索引，不扫描报告库）
+        
+        Args:
+            patient_id: 患者ID
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            报告列表（data 按需加载）
+        """
+        index = self._ensure_report_index(basic_info_key, reconcile=False)
+        return self._wrap_rows(self._cached_query(
+            ("patient", basic_info_key, str(patient_id)), lambda: index.patient_rows(patient_id)
+        ))
+    
+    def query(self, conditions: Optional[List[ConditionLike]] = None,
+              since: Union[str, date, None] = None, until: Union[str, date, None] = None,
+              limit: Optional[int] = None, basic_info_key: str = "基本信息") -> List[ReportRow]:
+        """
+        按报告内容的点分路径做结构化查询（多个条件同时满足）
+        
+        例如：
+            data_manager.query(['温度试验.检查结果 == "异常"'], since="2025-07-01", until="2025-09-30")
+            data_manager.query(['头脉冲试验.VOR增益 (左外半规管) < 0.8'])
+        
+        能由索引回答的条件直接在索引中求候选集，其余条件流式读取候选报告逐份校验
+        （不经过报告缓存，内存占用与数据库大小无关）。
+        
+        Args:
+            conditions: 条件列表，元素为表达式字符串、(路径, 运算符, 值) 元组或 Condition
+            since: 起始日期（含），YYYY-MM-DD 字符串或 date/datetime，按日期文件夹过滤
+            until: 结束日期（含），同上
+            limit: 最多返回条数，None 表示不限
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            匹配的报告列表（按文件名时间戳从新到旧，data 按需加载）
+        """
+        plan_conditions = [as_condition(c) for c in conditions or []]
+        index = self._ensure_report_index(basic_info_key)
+        since, until = _as_date_folder(since), _as_date_folder(until)
+        key = ("query", basic_info_key, tuple(map(repr, plan_conditions)), since, until, limit)
+        return self._wrap_rows(self._cached_query(
+            key, lambda: self._run_query(index, plan_conditions, since, until, limit)
+        ))
+    
+    def _run_query(self, index: ReportIndex, plan_conditions: List, since: Optional[str],
+                   until: Optional[str], limit: Optional[int]) -> List[Dict]:
+        """执行结构化查询，返回索引行"""
+        plan = plan_query(plan_conditions, index.indexed_paths(), index.ambiguous_literals())
+        filters = {"date_from": since, "date_to": until}
+        rows = index.query_rows(
+            [(c.path, c.op, c.value) for c in plan.indexed], filters,
+            limit=limit if plan.index_only else None
+        )
+        if plan.index_only:
+            return rows
+        
+        matched = []
+        for row in rows:
+            data = self._read_report_file(row["file_path"])
+            if data is None or not plan.matches(data):
+                continue
+            matched.append(row)
+            if limit is not None and len(matched) >= limit:
+                break
+        return matched
+    
+    def count_query(self, conditions: Optional[List[ConditionLike]] = None,
+                    since: Union[str, date, None] = None, until: Union[str, date, None] = None,
+                    basic_info_key: str = "基本信息") -> int:
+        """
+        统计满足条件的报告数量；条件全部落在索引上时（如 检查医生/检查设备/性别/检查时间）只读索引
+        
+        Args:
+            conditions: 同 query
+            since: 同 query
+            until: 同 query
+            basic_info_key: 基本信息在JSON中的key
+            
+        Returns:
+            报告数量
+        """
+        plan_conditions = [as_condition(c) for c in conditions or []]
+        # 与 query 同样按对账间隔与磁盘对账，计数才与 query 的结果一致
+        index = self._ensure_report_index(basic_info_key)
+        plan = plan_query(plan_conditions, index.indexed_paths(), index.ambiguous_literals())
+        if not plan.index_only:
+            return len(self.query(plan_conditions, since, until, basic_info_key=basic_info_key))
+        filters = {"date_from": _as_date_folder(since), "date_to": _as_date_folder(until)}
+        key = ("count_query", basic_info_key, tuple(map(repr, plan_conditions)),
+               filters["date_from"], filters["date_to"])
+        return self._cached_query(
+            key, lambda: index.count_rows([(c.path, c.op, c.value) for c in plan.indexed], filters)
+        )
+    
+    def search_reports(self, search_text: str, basic_info_key: str = "基本信息",
+                       within: Optional[List[str]] = None) -> List[Dict]:
+        """
+        搜索报告（基于倒排索引，覆盖报告内所有字段及文件路径）
+        
+        Args:
+            search_text: 搜索关键词，多个关键词以空格分隔（需同时命中）
+            basic_info_key: 基本信息在JSON中的key
+            within: 只在这些报告（文件路径）中搜索，用于在上一次搜索结果上细化（此时不再与磁盘对账）
+            
+        Returns:
+            匹配的报告列表
+        """
+        index = self._ensure_report_index(basic_info_key, reconcile=within is None)
+        if within is not None:
+            return self._wrap_rows(index.search(search_text, within))
+        key = ("search", basic_info_key, " ".join(search_text.lower().split()))
+        return self._wrap_rows(self._cached_query(key, lambda: index.search(search_text)))
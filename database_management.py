@@ -4,18 +4,44 @@ import json
 import os
 from datetime import datetime
 import platform
+import queue
 import subprocess
+import threading
 
 
 class DatabaseManagementPage(ctk.CTkScrollableFrame):
     """数据库管理页面 - 实现报告的增删查改功能"""
     
+    PAGE_SIZE = 100  # 每页加载的报告条数
+    LOAD_CHUNK_SIZE = 25  # 后台加载时每批送回界面的报告条数
+    LOAD_POLL_MS = 30  # 界面线程检查后台加载结果的间隔（毫秒）
+    ROW_HEIGHT = 40  # 列表行高
+    ROW_PITCH = 44  # 行高 + 上下间距
+    LIST_VISIBLE_ROWS = 10  # 列表区域默认显示的行数
+    SEARCH_DEBOUNCE_MS = 250  # 边输入边搜索：停止输入多久后执行搜索（毫秒）
+    BATCH_POLL_MS = 100  # 界面线程检查批量生成进度的间隔（毫秒）
+    
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
         self.db_path = controller.db_path
         self.selected_file_path = None
-        self.reports_data = []  # 存储报告列表数据
+        self.reports_data = []  # 存储已加载的报告列表数据（轻量行）
+        self._page_filters = {}  # 当前列表的过滤条件
+        self._page_cursor = None  # 下一页游标
+        self._total_reports = 0  # 满足过滤条件的报告总数
+        # 后台加载：每次加载有新的代号，旧加载的结果按代号丢弃
+        self._load_generation = 0
+        self._load_cancel = threading.Event()
+        self._load_queue = queue.Queue()
+        self._loading = False
+        self._polling = False
+        # 边输入边搜索：待执行的搜索，及最近一次完成的搜索 (关键词, 结果行)，用于在其基础上细化
+        self._search_after_id = None
+        self._last_search = None
+        # 批量生成：进行中时为取消事件，逐项结果经由队列送回界面线程
+        self._batch_cancel = None
+        self._batch_queue = queue.Queue()
         
         # 设置清晰的字体
         import platform as plat
@@ -63,10 +89,11 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
             height=32,
             font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
             corner_radius=8,
-            placeholder_text="输入患者ID、姓名或检查时间搜索..."
+            placeholder_text="输入患者ID、姓名（支持拼音/首字母）、检查时间或报告内容搜索..."
         )
         self.search_entry.pack(side="left", padx=(0, 10))
         self.search_entry.bind("<Return>", lambda e: self.search_reports())
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
         
         search_btn = ctk.CTkButton(
             search_frame,
@@ -114,15 +141,28 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
             )
             label.grid(row=0, column=i, padx=5, sticky="w")
         
-        # 创建滚动框架用于显示报告列表
-        self.reports_list_frame = ctk.CTkScrollableFrame(
-            list_frame,
+        # 报告列表（虚拟化：固定数量的行控件，滚动时重新绑定数据，渲染开销只取决于可见行数）
+        list_body = ctk.CTkFrame(list_frame, fg_color="transparent")
+        list_body.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        
+        self.reports_scrollbar = ctk.CTkScrollbar(list_body, command=self._on_list_scroll)
+        self.reports_scrollbar.pack(side="right", fill="y")
+        
+        self.reports_list_frame = ctk.CTkFrame(
+            list_body,
             fg_color="transparent",
-            corner_radius=0
+            corner_radius=0,
+            height=self.ROW_PITCH * self.LIST_VISIBLE_ROWS
         )
-        self.reports_list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.reports_list_frame.pack(side="left", fill="both", expand=True)
+        self.reports_list_frame.pack_propagate(False)
+        self.reports_list_frame.bind("<Configure>", self._on_list_resize)
+        self._bind_list_wheel(self.reports_list_frame)
+        
+        self._row_pool = []  # 行控件池
+        self._first_visible = 0  # 第一个可见行对应的报告序号
         
-        # 初始化单选按钮变量
+        # 当前选中的报告路径
         self.radio_var = ctk.StringVar(value="")
         
         # 按钮区域
@@ -143,6 +183,19 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         )
         view_btn.pack(side="left", padx=5)
         
+        history_btn = ctk.CTkButton(
+            button_frame,
+            text="历史报告",
+            command=self.show_patient_history,
+            width=100,
+            height=35,
+            corner_radius=8,
+            font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40")
+        )
+        history_btn.pack(side="left", padx=5)
+        
         edit_btn = ctk.CTkButton(
             button_frame,
             text="编辑报告",
@@ -172,7 +225,7 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         refresh_btn = ctk.CTkButton(
             button_frame,
             text="刷新列表",
-            command=self.load_reports,
+            command=self.refresh_reports,
             width=100,
             height=35,
             corner_radius=8,
@@ -182,6 +235,20 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         )
         refresh_btn.pack(side="left", padx=5)
         
+        self.load_more_btn = ctk.CTkButton(
+            button_frame,
+            text="加载更多",
+            command=self.load_more_reports,
+            width=100,
+            height=35,
+            corner_radius=8,
+            font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40"),
+            state="disabled"
+        )
+        self.load_more_btn.pack(side="left", padx=5)
+        
         # 生成报告按钮
         self.generate_report_btn = ctk.CTkButton(
             button_frame,
@@ -196,6 +263,19 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         )
         self.generate_report_btn.pack(side="left", padx=5)
         
+        batch_generate_btn = ctk.CTkButton(
+            button_frame,
+            text="批量生成",
+            command=self.show_batch_generate_dialog,
+            width=100,
+            height=35,
+            corner_radius=8,
+            font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40")
+        )
+        batch_generate_btn.pack(side="left", padx=5)
+        
         # 模板菜单（初始隐藏）
         self.template_menu_frame = None
         self.menu_visible = False
@@ -209,17 +289,8 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         )
         self.stats_label.pack(side="right", padx=10)
     
-    def load_reports(self):
-        """加载所有报告"""
-        self.reports_data = []
-        self._all_reports_data = []  # 保存所有原始数据用于搜索
-        report_folder = os.path.join(self.db_path, "report")
-        
-        if not os.path.exists(report_folder):
-            self._update_display()
-            return
-        
-        # 使用DataManager加载报告
+    def _get_basic_info_key(self):
+        """获取基本信息在报告JSON中的key"""
         from json_page_renderer import load_page_config
         basic_info_page_id = self.controller._get_basic_info_page_id()
         basic_info_page_config = load_page_config(basic_info_page_id)
@@ -227,126 +298,320 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         basic_info_key = "基本信息"  # 默认
         if basic_info_page_config:
             basic_info_key = basic_info_page_config.get("title") or basic_info_page_config.get("name") or "基本信息"
+        return basic_info_key
+    
+    def load_reports(self):
+        """加载报告列表（只加载第一页）"""
+        # 报告可能已变化（保存、删除、刷新），之前的搜索结果不能再用于细化
+        self._last_search = None
+        self._load_first_page({})
+    
+    def refresh_reports(self):
+        """刷新列表（立即与磁盘对账，以发现程序外的修改）"""
+        self.controller.data_manager.mark_index_stale()
+        self.load_reports()
+    
+    def _load_first_page(self, filters):
+        """按过滤条件重新加载第一页（后台进行，取消尚未完成的加载）"""
+        self.reports_data = []
+        self._page_filters = filters
+        self._page_cursor = None
+        self._total_reports = 0
+        
+        self._first_visible = 0
+        self._render_rows()
         
-        # 使用DataManager获取报告列表
-        all_reports = self.controller.data_manager.list_reports(basic_info_key)
+        within = None
+        text = filters.get("text", "")
+        if text and self._last_search is not None:
+            last_text, last_rows = self._last_search
+            # 关键词在上次基础上追加字符时，结果必然是上次结果的子集
+            if text.lower().startswith(last_text.lower()):
+                within = [row['file_path'] for row in last_rows]
+        self._start_load(None, count=True, within=within)
+    
+    def load_more_reports(self):
+        """加载下一页报告（后台进行）"""
+        if not self._page_cursor or self._loading:
+            return
+        self._start_load(self._page_cursor, count=False)
+    
+    def _start_load(self, cursor, count, within=None):
+        """
+        启动后台加载线程，结果分批经由队列送回，由界面线程的 after() 轮询取出显示
         
-        for report in all_reports:
-            self.reports_data.append(report)
-            self._all_reports_data.append(report)
+        Args:
+            cursor: 起始游标，None 表示第一页
+            count: 是否同时统计报告总数
+            within: 搜索时只在这些报告（文件路径）中细化
+        """
+        self._load_cancel.set()
+        self._load_generation += 1
+        self._load_cancel = threading.Event()
+        self._loading = True
+        self.load_more_btn.configure(state="disabled")
+        self.stats_label.configure(text="正在加载...")
         
+        worker = threading.Thread(
+            target=self._load_worker,
+            args=(self._load_generation, self._load_cancel, cursor, dict(self._page_filters),
+                  self._get_basic_info_key(), count, within),
+            daemon=True
+        )
+        worker.start()
+        if not self._polling:
+            self._polling = True
+            self.after(self.LOAD_POLL_MS, self._poll_load_queue)
+    
+    def _load_worker(self, generation, cancel, cursor, filters, basic_info_key, count, within=None):
+        """后台线程：按小批次读取一页报告，每批放入队列（不访问任何界面控件）"""
+        data_manager = self.controller.data_manager
+        try:
+            if filters.get("text"):
+                self._search_worker(generation, cancel, filters["text"], basic_info_key, within)
+                return
+            remaining = self.PAGE_SIZE
+            while remaining > 0 and not cancel.is_set():
+                page = data_manager.list_reports_page(
+                    cursor, min(self.LOAD_CHUNK_SIZE, remaining), filters, basic_info_key
+                )
+                cursor = page["next_cursor"]
+                remaining -= len(page["rows"])
+                self._load_queue.put((generation, "rows", (page["rows"], cursor)))
+                if not cursor:
+                    break
+            if count and not cancel.is_set():
+                total = data_manager.count_reports(filters, basic_info_key)
+                self._load_queue.put((generation, "total", total))
+        except Exception as e:
+            self._load_queue.put((generation, "error", str(e)))
+        finally:
+            self._load_queue.put((generation, "done", None))
+    
+    def _search_worker(self, generation, cancel, text, basic_info_key, within):
+        """后台线程：执行一次搜索（结果是轻量行，一次取全），分批送回界面"""
+        rows = self.controller.data_manager.search_reports(text, basic_info_key, within)
+        for start in range(0, len(rows), self.PAGE_SIZE):
+            if cancel.is_set():
+                return
+            self._load_queue.put((generation, "rows", (rows[start:start + self.PAGE_SIZE], None)))
+        self._load_queue.put((generation, "total", len(rows)))
+        self._load_queue.put((generation, "search", (text, rows)))
+    
+    def _poll_load_queue(self):
+        """界面线程：取出后台加载的结果并追加显示；丢弃已被取消的旧加载的结果"""
+        finished = False
+        while True:
+            try:
+                generation, kind, payload = self._load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._load_generation:
+                continue
+            if kind == "rows":
+                rows, cursor = payload
+                self._append_page({"rows": rows, "next_cursor": cursor})
+            elif kind == "total":
+                self._total_reports = payload
+            elif kind == "search":
+                self._last_search = payload
+            elif kind == "error":
+                print(f"加载报告列表失败: {payload}")
+            else:
+                finished = True
+        if finished:
+            self._loading = False
+            self._polling = False
+            self._total_reports = max(self._total_reports, len(self.reports_data))
+            self._update_stats()
+        else:
+            self.after(self.LOAD_POLL_MS, self._poll_load_queue)
+    
+    def _append_page(self, page):
+        """将一页（或一批）报告追加到列表显示"""
+        self.reports_data.extend(page["rows"])
+        self._page_cursor = page["next_cursor"]
         self._update_display()
     
+    def _update_stats(self):
+        """更新统计信息与"加载更多"按钮状态"""
+        if self._loading:
+            self.stats_label.configure(text=f"正在加载...（已显示 {len(self.reports_data)} 条）")
+            self.load_more_btn.configure(state="disabled")
+            return
+        if len(self.reports_data) < self._total_reports:
+            text = f"共 {self._total_reports} 条记录（已显示 {len(self.reports_data)} 条）"
+        else:
+            text = f"共 {self._total_reports} 条记录"
+        self.stats_label.configure(text=text)
+        self.load_more_btn.configure(state="normal" if self._page_cursor else "disabled")
+    
     def _update_display(self):
-        """更新显示"""
-        # 清空现有显示
-        for widget in self.reports_list_frame.winfo_children():
-            widget.destroy()
+        """更新显示（数据追加后只需重新绑定可见行）"""
+        self._render_rows()
+        self._update_stats()
+    
+    def _bind_list_wheel(self, widget):
+        """列表区域的鼠标滚轮滚动列表（而不是整个页面）"""
+        widget.bind("<MouseWheel>", self._on_list_wheel)
+        widget.bind("<Button-4>", self._on_list_wheel)
+        widget.bind("<Button-5>", self._on_list_wheel)
+    
+    def _create_row(self, slot):
+        """创建一个行控件（只在行控件池扩大时调用）"""
+        font = ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1])
+        row_frame = ctk.CTkFrame(self.reports_list_frame, corner_radius=8, height=self.ROW_HEIGHT)
+        row_frame.pack_propagate(False)
         
-        # 显示报告列表
-        for i, report in enumerate(self.reports_data):
-            row_frame = ctk.CTkFrame(
-                self.reports_list_frame,
-                fg_color=("gray98", "gray16") if i % 2 == 0 else ("gray95", "gray19"),
-                corner_radius=8,
-                height=40
-            )
-            row_frame.pack(fill="x", padx=5, pady=2)
-            row_frame.pack_propagate(False)
-            
-            # 创建单选按钮用于选择
-            radio = ctk.CTkRadioButton(
-                row_frame,
-                text="",
-                variable=self.radio_var,
-                value=report['file_path'],
-                command=lambda p=report['file_path']: self._select_report(p),
-                width=20
-            )
-            radio.pack(side="left", padx=10)
-            
-            # 绑定点击行选择
-            row_frame.bind("<Button-1>", lambda e, p=report['file_path']: self._select_report(p))
-            for child in row_frame.winfo_children():
-                child.bind("<Button-1>", lambda e, p=report['file_path']: self._select_report(p))
-            
-            # 患者ID
-            id_label = ctk.CTkLabel(
-                row_frame,
-                text=report['patient_id'],
-                font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
-                width=120,
-                anchor="w"
-            )
-            id_label.pack(side="left", padx=5)
-            
-            # 姓名
-            name_label = ctk.CTkLabel(
-                row_frame,
-                text=report['name'],
-                font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
-                width=150,
-                anchor="w"
-            )
-            name_label.pack(side="left", padx=5)
-            
-            # 检查时间
-            time_label = ctk.CTkLabel(
-                row_frame,
-                text=report['exam_time'],
-                font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
-                width=150,
-                anchor="w"
-            )
-            time_label.pack(side="left", padx=5)
+        # 单选按钮仅用于显示选中状态，选中逻辑由 _select_slot 处理
+        radio = ctk.CTkRadioButton(
+            row_frame,
+            text="",
+            command=lambda s=slot: self._select_slot(s),
+            width=20
+        )
+        radio.pack(side="left", padx=10)
+        
+        labels = []
+        for width in (120, 150, 150):
+            label = ctk.CTkLabel(row_frame, text="", font=font, width=width, anchor="w")
+            label.pack(side="left", padx=5)
+            labels.append(label)
+        path_label = ctk.CTkLabel(
+            row_frame,
+            text="",
+            font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=10),
+            width=400,
+            anchor="w",
+            text_color=("gray50", "gray50")
+        )
+        path_label.pack(side="left", padx=5, fill="x", expand=True)
+        labels.append(path_label)
+        
+        for widget in (row_frame, radio, *labels):
+            widget.bind("<Button-1>", lambda e, s=slot: self._select_slot(s))
+            self._bind_list_wheel(widget)
+        return {"frame": row_frame, "radio": radio, "labels": labels, "index": None}
+    
+    def _visible_row_count(self):
+        height = self.reports_list_frame.winfo_height()
+        if height <= 1:
+            height = self.ROW_PITCH * self.LIST_VISIBLE_ROWS
+        return max(1, height // self.ROW_PITCH)
+    
+    def _on_list_resize(self, event=None):
+        """列表区域尺寸变化时调整行控件池大小"""
+        self._render_rows()
+    
+    def _render_rows(self):
+        """将行控件池绑定到从 _first_visible 开始的报告"""
+        visible = self._visible_row_count()
+        while len(self._row_pool) < visible:
+            self._row_pool.append(self._create_row(len(self._row_pool)))
+        
+        total = len(self.reports_data)
+        self._first_visible = max(0, min(self._first_visible, total - visible))
+        selected = self.radio_var.get()
+        for slot, row in enumerate(self._row_pool):
+            i = self._first_visible + slot
+            if slot >= visible or i >= total:
+                if row["index"] is not None:
+                    row["frame"].pack_forget()
+                    row["index"] = None
+                continue
+            report = self.reports_data[i]
+            if row["index"] is None:
+                row["frame"].pack(fill="x", padx=5, pady=2)
+            row["index"] = i
+            row["frame"].configure(fg_color=("gray98", "gray16") if i % 2 == 0 else ("gray95", "gray19"))
             
             # 文件路径（截断显示）
             file_path_display = report['file_path']
             if len(file_path_display) > 50:
                 file_path_display = "..." + file_path_display[-47:]
-            path_label = ctk.CTkLabel(
-                row_frame,
-                text=file_path_display,
-                font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=10),
-                width=400,
-                anchor="w",
-                text_color=("gray50", "gray50")
-            )
-            path_label.pack(side="left", padx=5, fill="x", expand=True)
+            texts = (report['patient_id'], report['name'], report['exam_time'], file_path_display)
+            for label, text in zip(row["labels"], texts):
+                label.configure(text=text)
+            if report['file_path'] == selected:
+                row["radio"].select()
+            else:
+                row["radio"].deselect()
         
-        # 更新统计信息
-        self.stats_label.configure(text=f"共 {len(self.reports_data)} 条记录")
+        if total > visible:
+            self.reports_scrollbar.set(self._first_visible / total, (self._first_visible + visible) / total)
+        else:
+            self.reports_scrollbar.set(0.0, 1.0)
+    
+    def _scroll_to(self, first):
+        first = max(0, min(first, len(self.reports_data) - self._visible_row_count()))
+        if first != self._first_visible:
+            self._first_visible = first
+            self._render_rows()
+    
+    def _on_list_scroll(self, action, amount, unit=None):
+        """滚动条回调：('moveto', 比例) 或 ('scroll', 步数, 'units'/'pages')"""
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.reports_data)))
+        elif action == "scroll":
+            step = self._visible_row_count() if unit == "pages" else 1
+            self._scroll_to(self._first_visible + int(amount) * step)
+    
+    def _on_list_wheel(self, event):
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self._scroll_to(self._first_visible + delta * 3)
+        # 阻止外层页面同时滚动
+        return "break"
+    
+    def _select_slot(self, slot):
+        """点击行控件：选中其当前绑定的报告"""
+        index = self._row_pool[slot]["index"]
+        if index is not None:
+            self._select_report(self.reports_data[index]['file_path'])
     
     def _select_report(self, file_path):
         """选择报告"""
         self.selected_file_path = file_path
         self.radio_var.set(file_path)
+        self._render_rows()
+    
+    def _on_search_key(self, event=None):
+        """输入时防抖：停止输入 SEARCH_DEBOUNCE_MS 毫秒后才搜索"""
+        if event is not None and event.keysym == "Return":
+            return
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(self.SEARCH_DEBOUNCE_MS, self._search_if_changed)
+    
+    def _search_if_changed(self):
+        self._search_after_id = None
+        # 关键词未变化（如仅移动光标、按修饰键）时无需重新搜索
+        if self.search_entry.get().strip() != self._page_filters.get("text", ""):
+            self.search_reports()
     
     def search_reports(self):
-        """搜索报告"""
+        """搜索报告（后台执行，取消尚未完成的上一次搜索）"""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
         search_text = self.search_entry.get().strip()
         
         if not search_text:
             self.load_reports()
             return
         
-        # 使用DataManager搜索报告
-        from json_page_renderer import load_page_config
-        basic_info_page_id = self.controller._get_basic_info_page_id()
-        basic_info_page_config = load_page_config(basic_info_page_id)
-        
-        basic_info_key = "基本信息"  # 默认
-        if basic_info_page_config:
-            basic_info_key = basic_info_page_config.get("title") or basic_info_page_config.get("name") or "基本信息"
-        
-        filtered_reports = self.controller.data_manager.search_reports(search_text, basic_info_key)
-        
-        # 显示过滤后的数据
-        self.reports_data = filtered_reports
-        self._update_display()
+        # 使用DataManager分页搜索报告
+        self._load_first_page({"text": search_text})
     
     def clear_search(self):
         """清空搜索"""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
         self.search_entry.delete(0, "end")
         self.load_reports()
     
@@ -523,19 +788,247 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
             error_msg = f"生成报告失败:\n{str(e)}\n\n详细信息:\n{traceback.format_exc()}"
             messagebox.showerror("错误", error_msg)
     
+    def show_batch_generate_dialog(self):
+        """批量生成报告：对当前列表（含搜索结果）或日期范围内的报告用进程池在后台生成Excel，界面不阻塞"""
+        self.hide_template_menu()
+        if self._batch_cancel is not None:
+            messagebox.showinfo("提示", "批量生成正在进行中")
+            return
+        templates = self.load_templates()
+        if not templates:
+            messagebox.showerror("错误", "没有可用的报告模板")
+            return
+        
+        font = ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1])
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("批量生成报告")
+        dialog.geometry("480x330")
+        dialog.transient(self.controller.root)
+        dialog.lift()
+        dialog.focus_force()
+        
+        # 生成范围
+        scope_var = ctk.StringVar(value="list")
+        list_radio = ctk.CTkRadioButton(
+            dialog,
+            text=f"当前列表中的报告（{len(self.reports_data)} 份）",
+            variable=scope_var,
+            value="list",
+            font=font
+        )
+        list_radio.pack(padx=20, pady=(20, 5), anchor="w")
+        
+        range_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        range_frame.pack(fill="x", padx=20, pady=5)
+        range_radio = ctk.CTkRadioButton(range_frame, text="日期范围", variable=scope_var, value="range", font=font)
+        range_radio.pack(side="left")
+        today = datetime.now().strftime("%Y-%m-%d")
+        date_from_entry = ctk.CTkEntry(range_frame, width=110, font=font, placeholder_text="YYYY-MM-DD")
+        date_from_entry.insert(0, today)
+        date_from_entry.pack(side="left", padx=(10, 5))
+        ctk.CTkLabel(range_frame, text="至", font=font).pack(side="left", padx=5)
+        date_to_entry = ctk.CTkEntry(range_frame, width=110, font=font, placeholder_text="YYYY-MM-DD")
+        date_to_entry.insert(0, today)
+        date_to_entry.pack(side="left", padx=5)
+        
+        # 模板
+        template_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        template_frame.pack(fill="x", padx=20, pady=10)
+        ctk.CTkLabel(template_frame, text="模板:", font=font).pack(side="left", padx=(0, 10))
+        template_ids = {t.get("name", t.get("id", "未知模板")): t.get("id") for t in templates}
+        template_var = ctk.StringVar(value=next(iter(template_ids)))
+        template_menu = ctk.CTkOptionMenu(
+            template_frame,
+            values=list(template_ids),
+            variable=template_var,
+            width=220,
+            font=font
+        )
+        template_menu.pack(side="left")
+        
+        # 进度
+        progress_bar = ctk.CTkProgressBar(dialog, width=440)
+        progress_bar.set(0)
+        progress_bar.pack(padx=20, pady=(10, 5))
+        progress_label = ctk.CTkLabel(dialog, text="", font=font, text_color=("gray40", "gray60"))
+        progress_label.pack(padx=20, anchor="w")
+        
+        button_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        button_frame.pack(fill="x", padx=20, pady=(10, 15))
+        
+        progress = {"total": 0, "done": 0, "failed": [], "output_dir": None}
+        
+        def parse_date(entry):
+            text = entry.get().strip()
+            if not text:
+                return None
+            datetime.strptime(text, "%Y-%m-%d")
+            return text
+        
+        def start():
+            basic_info_key = self._get_basic_info_key()
+            if scope_var.get() == "list":
+                file_paths = [row["file_path"] for row in self.reports_data]
+                date_range = None
+                total = len(file_paths)
+            else:
+                try:
+                    date_range = (parse_date(date_from_entry), parse_date(date_to_entry))
+                except ValueError:
+                    messagebox.showerror("错误", "日期格式应为 YYYY-MM-DD", parent=dialog)
+                    return
+                file_paths = None
+                total = self.controller.data_manager.count_reports(
+                    {"date_from": date_range[0], "date_to": date_range[1]}, basic_info_key
+                )
+            if total == 0:
+                messagebox.showinfo("提示", "没有需要生成的报告", parent=dialog)
+                return
+            
+            progress.update(total=total, done=0, failed=[], output_dir=None)
+            progress_label.configure(text=f"正在生成... 0/{total}")
+            start_btn.configure(state="disabled")
+            close_btn.configure(text="取消")
+            self._batch_cancel = threading.Event()
+            worker = threading.Thread(
+                target=self._batch_worker,
+                args=(self._batch_cancel, file_paths, date_range, template_ids[template_var.get()], basic_info_key),
+                daemon=True
+            )
+            worker.start()
+            self.after(self.BATCH_POLL_MS, poll)
+        
+        def poll():
+            """界面线程：取出批量生成的逐项结果并更新进度"""
+            finished = False
+            while True:
+                try:
+                    kind, payload = self._batch_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "result":
+                    progress["done"] += 1
+                    if payload["error"]:
+                        progress["failed"].append((payload["key"], payload["error"]))
+                    else:
+                        progress["output_dir"] = os.path.dirname(payload["output_path"])
+                elif kind == "error":
+                    progress["failed"].append(("", payload))
+                else:
+                    finished = True
+            
+            if dialog.winfo_exists():
+                total = max(progress["total"], progress["done"])
+                progress_bar.set(progress["done"] / total)
+                progress_label.configure(
+                    text=f"正在生成... {progress['done']}/{total}（失败 {len(progress['failed'])}）"
+                )
+            if not finished:
+                self.after(self.BATCH_POLL_MS, poll)
+                return
+            
+            cancelled = self._batch_cancel.is_set()
+            self._batch_cancel = None
+            if dialog.winfo_exists():
+                dialog.destroy()
+            succeeded = progress["done"] - len(progress["failed"])
+            summary = f"{'已取消，' if cancelled else ''}成功生成 {succeeded} 份，失败 {len(progress['failed'])} 份"
+            if progress["failed"]:
+                details = "\n".join(
+                    f"{os.path.basename(str(key))}: {error}" for key, error in progress["failed"][:10]
+                )
+                summary += f"\n\n{details}"
+                if len(progress["failed"]) > 10:
+                    summary += f"\n...（共 {len(progress['failed'])} 项）"
+            if progress["output_dir"]:
+                if messagebox.askyesno("批量生成完成", f"{summary}\n\n是否打开输出文件夹？"):
+                    self._open_generated_report(progress["output_dir"])
+            else:
+                messagebox.showinfo("批量生成完成", summary)
+        
+        def close():
+            if self._batch_cancel is not None:
+                # 取消：不再提交新任务，已在生成的报告完成后结束
+                self._batch_cancel.set()
+                close_btn.configure(state="disabled")
+                progress_label.configure(text="正在取消...")
+            else:
+                dialog.destroy()
+        
+        start_btn = ctk.CTkButton(
+            button_frame,
+            text="开始生成",
+            command=start,
+            width=100,
+            height=35,
+            corner_radius=8,
+            font=font,
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40")
+        )
+        start_btn.pack(side="left", padx=5)
+        
+        close_btn = ctk.CTkButton(
+            button_frame,
+            text="关闭",
+            command=close,
+            width=100,
+            height=35,
+            corner_radius=8,
+            font=font,
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40")
+        )
+        close_btn.pack(side="left", padx=5)
+        
+        dialog.protocol("WM_DELETE_WINDOW", close)
+    
+    def _batch_worker(self, cancel, file_paths, date_range, template_id, basic_info_key):
+        """后台线程：读取报告交给 ExcelGenerator.generate_many，逐项结果放入队列（不访问任何界面控件）"""
+        from excel_generator import ExcelGenerator
+        
+        data_manager = self.controller.data_manager
+        
+        def reports():
+            if file_paths is None:
+                for report in data_manager.iter_reports(*date_range, basic_info_key=basic_info_key):
+                    yield report["file_path"], report["data"]
+                return
+            for file_path in file_paths:
+                data = data_manager.load_report(file_path)
+                if data is None:
+                    self._batch_queue.put(("result", {
+                        "key": file_path, "template_id": template_id, "output_path": None, "error": "无法加载报告数据"
+                    }))
+                    continue
+                yield file_path, data
+        
+        try:
+            workers = self.controller.config.get("report_template", {}).get("batch_workers")
+            for result in ExcelGenerator.generate_many(
+                reports(), [template_id], workers=workers, database_path=self.db_path, cancel=cancel
+            ):
+                self._batch_queue.put(("result", result))
+        except Exception as e:
+            self._batch_queue.put(("error", str(e)))
+        finally:
+            self._batch_queue.put(("done", None))
+    
     def view_report(self):
         """查看报告详情"""
         if not self.selected_file_path:
             messagebox.showwarning("提示", "请先选择要查看的报告")
             return
         
-        if not os.path.exists(self.selected_file_path):
+        if not self.controller.data_manager.report_exists(self.selected_file_path):
             messagebox.showerror("错误", "报告文件不存在")
             return
         
         try:
-            with open(self.selected_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.controller.data_manager.load_report(self.selected_file_path)
+            if data is None:
+                messagebox.showerror("错误", "无法加载报告数据")
+                return
             
             # 创建详情窗口
             detail_window = ctk.CTkToplevel(self)
@@ -566,20 +1059,93 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
         except Exception as e:
             messagebox.showerror("错误", f"读取报告失败: {str(e)}")
     
+    def show_patient_history(self):
+        """显示所选报告患者的历次报告（按时间从旧到新），便于与既往结果对比"""
+        if not self.selected_file_path:
+            messagebox.showwarning("提示", "请先选择要查看历史的报告")
+            return
+        
+        report = next((r for r in self.reports_data if r["file_path"] == self.selected_file_path), None)
+        if report is None:
+            messagebox.showerror("错误", "报告不在当前列表中，请刷新后重试")
+            return
+        
+        patient_id = report["patient_id"]
+        timeline = self.controller.data_manager.patient_timeline(patient_id, self._get_basic_info_key())
+        
+        history_window = ctk.CTkToplevel(self)
+        history_window.title(f"历史报告 - {report['name']}（{patient_id}）")
+        history_window.geometry("600x400")
+        history_window.transient(self.controller.root)
+        history_window.lift()
+        history_window.focus_force()
+        
+        summary_label = ctk.CTkLabel(
+            history_window,
+            text=f"患者 {report['name']}（ID: {patient_id}）共 {len(timeline)} 次检查",
+            font=ctk.CTkFont(family=self.DEFAULT_FONT_BOLD[0], size=12, weight="bold")
+        )
+        summary_label.pack(padx=20, pady=(15, 5), anchor="w")
+        
+        history_frame = ctk.CTkScrollableFrame(history_window)
+        history_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        for i, visit in enumerate(timeline):
+            is_current = visit["file_path"] == self.selected_file_path
+            row_frame = ctk.CTkFrame(
+                history_frame,
+                fg_color=("gray98", "gray16") if i % 2 == 0 else ("gray95", "gray19"),
+                corner_radius=8
+            )
+            row_frame.pack(fill="x", padx=5, pady=2)
+            
+            visit_label = ctk.CTkLabel(
+                row_frame,
+                text=f"第 {i + 1} 次    检查时间: {visit['exam_time']}    ({visit['date_folder']})"
+                     + ("    [当前]" if is_current else ""),
+                font=ctk.CTkFont(
+                    family=self.DEFAULT_FONT_BOLD[0] if is_current else self.DEFAULT_FONT[0],
+                    size=self.DEFAULT_FONT[1],
+                    weight="bold" if is_current else "normal"
+                ),
+                anchor="w"
+            )
+            visit_label.pack(side="left", padx=10, pady=5, fill="x", expand=True)
+            
+            open_btn = ctk.CTkButton(
+                row_frame,
+                text="查看",
+                command=lambda p=visit["file_path"]: self._view_history_report(p),
+                width=60,
+                height=28,
+                corner_radius=8,
+                font=ctk.CTkFont(family=self.DEFAULT_FONT[0], size=self.DEFAULT_FONT[1]),
+                fg_color=("gray70", "gray30"),
+                hover_color=("gray60", "gray40")
+            )
+            open_btn.pack(side="right", padx=10, pady=5)
+    
+    def _view_history_report(self, file_path):
+        """从历史报告窗口查看某次报告"""
+        self._select_report(file_path)
+        self.view_report()
+    
     def edit_report(self):
         """编辑报告 - 在文本编辑器中直接编辑JSON文件"""
         if not self.selected_file_path:
             messagebox.showwarning("提示", "请先选择要编辑的报告")
             return
         
-        if not os.path.exists(self.selected_file_path):
+        if not self.controller.data_manager.report_exists(self.selected_file_path):
             messagebox.showerror("错误", "报告文件不存在")
             return
         
         try:
-            # 读取JSON文件
-            with open(self.selected_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 读取报告数据
+            data = self.controller.data_manager.load_report(self.selected_file_path)
+            if data is None:
+                messagebox.showerror("错误", "无法加载报告数据")
+                return
             
             # 创建编辑窗口
             edit_window = ctk.CTkToplevel(self)
@@ -632,9 +1198,13 @@ class DatabaseManagementPage(ctk.CTkScrollableFrame):
                     # 验证JSON格式
                     json_data = json.loads(content)
                     
-                    # 保存到文件
-                    with open(self.selected_file_path, 'w', encoding='utf-8') as f:
-                        json.dump(json_data, f, ensure_ascii=False, indent=2)
+                    # 通过DataManager保存（同步更新报告索引）
+                    success, message = self.controller.data_manager.save_report(
+                        json_data, file_path=self.selected_file_path
+                    )
+                    if not success:
+                        messagebox.showerror("错误", message)
+                        return
                     
                     messagebox.showinfo("成功", "报告已成功保存")
                     edit_window.destroy()
@@ -1,9 +1,29 @@
 """
 Excel报告生成器 - 基于JSON配置文件的通用Excel生成系统
 支持动态布局、条件显示、样式定义、数据格式化等功能
+
+模板工作簿与模板索引/配置JSON在进程内按 (路径, mtime, size) 缓存：
+模板文件只解析一次，之后每份报告从缓存的序列化副本克隆出独立的工作簿；文件修改后自动重新加载。
+
+基于模板文件生成时，data_cells 先编译为执行计划（TemplatePlan）：数据路径预先拆分、
+目标单元格预先解析、合并与样式预先应用到模板副本上，按模板版本缓存；每份报告只需逐格取值写入。
+合并区域的主单元格通过按工作表建立的坐标索引（MergedCellIndex）查找，不再逐个遍历合并区域。
+
+批量生成（ExcelGenerator.generate_many）把报告分发到进程池，每个工作进程各自持有上述缓存。
+
+模板配置 "generation_backend": "xml_patch" 时改用 xlsx_patch 直接改写工作表XML中的单元格值，
+不再逐份经过 openpyxl 的反序列化与保存；遇到无法直接写出的值时该份报告仍由 openpyxl 生成。
 """
+import copy
+import copyreg
+import io
 import json
+import multiprocessing
 import os
+import pickle
+import threading
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
 import re
 
@@ -11,6 +31,210 @@ from openpyxl import Workbook, load_workbook
 from openpyxl.cell.cell import MergedCell
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.worksheet.dimensions import DimensionHolder
+
+from xlsx_patch import UnsupportedValue, XlsxPatchTemplate
+
+
+# 进程内缓存：路径 -> ((mtime_ns, size), 内容)
+_json_cache = {}
+_template_cache = {}
+# 执行计划缓存：(配置路径, 配置签名, 模板路径, 模板签名) -> TemplatePlan
+_plan_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _rebuild_dimension_holder(worksheet, reference, default_factory, max_outline, items):
+    holder = DimensionHolder(worksheet, reference, default_factory)
+    holder.max_outline = max_outline
+    dict.update(holder, items)
+    return holder
+
+
+def _reduce_dimension_holder(holder):
+    return _rebuild_dimension_holder, (
+        holder.worksheet, holder.reference, holder.default_factory, holder.max_outline, dict(holder)
+    )
+
+
+# openpyxl 的行/列尺寸容器继承自 defaultdict，默认的序列化会把工作表当作 default_factory 传回，
+# 克隆出的工作簿无法新增行列尺寸，也无法再次序列化；这里按完整状态序列化
+copyreg.pickle(DimensionHolder, _reduce_dimension_holder)
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_json_cached(path):
+    """读取JSON文件（按 mtime/size 缓存解析结果，返回可自由修改的副本）"""
+    key = os.path.abspath(path)
+    signature = _file_signature(key)
+    with _cache_lock:
+        cached = _json_cache.get(key)
+    if cached is None or cached[0] != signature:
+        with open(key, "r", encoding="utf-8") as f:
+            cached = (signature, json.load(f))
+        with _cache_lock:
+            _json_cache[key] = cached
+    return copy.deepcopy(cached[1])
+
+
+def load_template_workbook(path):
+    """
+    加载模板工作簿（进程内缓存）
+
+    首次加载时解析模板并保存其序列化副本，之后每次反序列化出一个独立的工作簿，
+    比重新解析xlsx快一个数量级；工作簿无法序列化时退回缓存原始文件内容。
+
+    Args:
+        path: 模板文件路径
+
+    Returns:
+        可自由修改的工作簿
+    """
+    key = os.path.abspath(path)
+    signature = _file_signature(key)
+    with _cache_lock:
+        cached = _template_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        kind, blob = cached[1]
+        if kind == "pickle":
+            return pickle.loads(blob)
+        return load_workbook(io.BytesIO(blob))
+
+    with open(key, "rb") as f:
+        raw = f.read()
+    wb = load_workbook(io.BytesIO(raw))
+    try:
+        entry = ("pickle", pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        entry = ("bytes", raw)
+    with _cache_lock:
+        _template_cache[key] = (signature, entry)
+    return wb
+
+
+def _split_path(data_path):
+    return tuple(data_path.split(".")) if data_path else ("",)
+
+
+def _make_empty_predicate(empty_values):
+    """
+    由配置的空值列表构造判空函数：可哈希的空值放入集合，列表/字典按长度或逐个比较
+
+    Args:
+        empty_values: 空值列表（如 ["", None, [], {}, "未知"]）
+
+    Returns:
+        判空函数 value -> bool
+    """
+    hashable = set()
+    unhashable = []
+    for item in empty_values:
+        try:
+            hashable.add(item)
+        except TypeError:
+            unhashable.append(item)
+
+    def is_empty(value):
+        if isinstance(value, (list, dict)):
+            return len(value) == 0 or value in unhashable
+        try:
+            return value in hashable
+        except TypeError:
+            return value in unhashable
+
+    return is_empty
+
+
+class MergedCellIndex:
+    """工作表合并区域索引：(行, 列) -> 合并区域主单元格的 (行, 列)"""
+
+    def __init__(self, worksheet):
+        self.masters = {}
+        for merged_range in worksheet.merged_cells.ranges:
+            self.add(*merged_range.bounds)
+
+    def add(self, min_col, min_row, max_col, max_row):
+        """
+        登记一个合并区域（与已登记区域重叠的坐标保持原主单元格）
+
+        Args:
+            min_col, min_row, max_col, max_row: 区域边界（同 range_boundaries 的返回值）
+        """
+        master = (min_row, min_col)
+        masters = self.masters
+        for row in range(min_row, max_row + 1):
+            for column in range(min_col, max_col + 1):
+                masters.setdefault((row, column), master)
+
+    def master(self, row, column):
+        """坐标所在合并区域的主单元格 (行, 列)，不在合并区域内时返回自身"""
+        return self.masters.get((row, column), (row, column))
+
+
+class CompiledCell:
+    """编译后的 data_cells 条目：数据路径已拆分、取值规则已展开"""
+
+    __slots__ = ("range", "paths", "secondary", "value_type", "format", "default", "presence",
+                 "style", "coordinate", "row", "column")
+
+    def __init__(self, cell_config, empty_default):
+        """
+        Args:
+            cell_config: data_cells 中的一项
+            empty_default: 模板级的空值默认值（empty_value_handling.default）
+        """
+        self.range = cell_config.get("range") or cell_config.get("cell")
+        paths = cell_config.get("paths")
+        self.paths = tuple(_split_path(p) for p in paths) if paths else (_split_path(cell_config.get("data_path", "")),)
+        self.secondary = _split_path(cell_config.get("secondary_path", ""))
+        self.value_type = cell_config.get("value_type")
+        self.format = cell_config.get("format")
+        self.default = cell_config.get("default", empty_default)
+        self.style = cell_config.get("style")
+        self.presence = None
+        presence_cfg = cell_config.get("presence_from_list")
+        if presence_cfg:
+            includes = presence_cfg.get("includes", [])
+            if isinstance(includes, str):
+                includes = [includes]
+            self.presence = (
+                _split_path(presence_cfg.get("source_path", "")),
+                frozenset(includes or []),
+                frozenset(presence_cfg.get("group_includes") or []),
+                presence_cfg.get("present_value", "√"),
+                presence_cfg.get("absent_value", ""),
+                presence_cfg.get("absent_value_when_group_present"),
+            )
+        # 写入目标（合并区域的主单元格），编译执行计划时在模板上解析
+        self.coordinate = None
+        self.row = None
+        self.column = None
+
+
+class TemplatePlan:
+    """
+    模板执行计划：编译后的 data_cells、N/A补齐分组，以及已应用合并、样式、页面设置的模板序列化副本
+    """
+
+    def __init__(self, cells, na_groups, sheet_name, prepared, patch=None):
+        self.cells = cells
+        self.na_groups = na_groups
+        self.sheet_name = sheet_name
+        # 预处理后的模板工作簿（pickle），每份报告反序列化一份；无法序列化时为 None
+        self.prepared = prepared
+        # generation_backend 为 xml_patch 时预分析的模板包（XlsxPatchTemplate）
+        self.patch = patch
+
+
+def _select_sheet(wb, sheet_name):
+    if sheet_name and sheet_name in wb.sheetnames:
+        return wb[sheet_name]
+    return wb.active
 
 
 class ExcelGenerator:
@@ -28,24 +252,32 @@ class ExcelGenerator:
         self.template_id = template_id
 
         if config_path:
+            self.config_path = config_path
             self.config = self._load_config(config_path)
         else:
             if template_id is None:
                 index_path = os.path.join(database_path, "templates", "templates_index.json")
                 if os.path.exists(index_path):
-                    with open(index_path, "r", encoding="utf-8") as f:
-                        index_data = json.load(f)
+                    index_data = _read_json_cached(index_path)
                     template_id = index_data.get("default_template", "default_template")
                 else:
                     template_id = "default_template"
                 self.template_id = template_id
 
             config_path = self._find_template_config(database_path, self.template_id)
+            self.config_path = config_path
             self.config = self._load_config(config_path)
 
         self.template_file = self.config.get("template_file")
         self.styles = self._build_styles(self.config.get("styles", {}))
         self.current_row_tracker = {}  # 跟踪每个工作表的当前行
+        empty_handling = self.config.get("empty_value_handling", {})
+        self._is_empty_value = _make_empty_predicate(
+            empty_handling.get("check_empty_values", ["", None, [], {}, "未知", "无", "N/A", "NULL"])
+        )
+        self._empty_default = empty_handling.get("default", "")
+        # 工作表 -> MergedCellIndex（首次查找主单元格时建立，合并时增量更新）
+        self._merged_indexes = weakref.WeakKeyDictionary()
 
     def _find_template_config(self, database_path, template_id):
         """从模板索引中查找配置文件路径"""
@@ -56,8 +288,7 @@ class ExcelGenerator:
             if os.path.exists(default_path):
                 return default_path
             raise FileNotFoundError(f"模板索引文件不存在: {index_path}")
-        with open(index_path, 'r', encoding='utf-8') as f:
-            index_data = json.load(f)
+        index_data = _read_json_cached(index_path)
 
         templates = index_data.get("templates", [])
         for template in templates:
@@ -75,8 +306,7 @@ class ExcelGenerator:
     def _load_config(self, config_path):
         """加载配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            config = _read_json_cached(config_path)
 
             # 如果配置中的template_file是相对路径，尝试从数据库路径解析
             template_file = config.get("template_file", "")
@@ -154,9 +384,7 @@ class ExcelGenerator:
     
     def _is_empty(self, value):
         """检查值是否为空"""
-        empty_values = self.config.get("empty_value_handling", {}).get("check_empty_values", 
-            ["", None, [], {}, "未知", "无", "N/A", "NULL"])
-        return value in empty_values or (isinstance(value, (list, dict)) and len(value) == 0)
+        return self._is_empty_value(value)
     
     def _is_section_empty(self, data, section_key):
         """检查整个section是否为空"""
@@ -172,7 +400,10 @@ class ExcelGenerator:
     
     def _get_data_value(self, data, data_path):
         """根据数据路径获取值（支持嵌套路径，如 '基本信息.ID'）"""
-        keys = data_path.split('.')
+        return self._get_value_by_keys(data, data_path.split('.'))
+    
+    def _get_value_by_keys(self, data, keys):
+        """按已拆分的路径取值"""
         value = data
         for key in keys:
             if isinstance(value, dict):
@@ -255,11 +486,127 @@ class ExcelGenerator:
         current = self._get_current_row(worksheet_name)
         self._set_current_row(worksheet_name, current + increment)
     
-    def generate(self, json_data, output_path=None):
-        """生成Excel报告"""
+    def generate(self, json_data, output_path=None, timestamp=None):
+        """生成Excel报告
+
+        Args:
+            json_data: 报告数据
+            output_path: 输出路径，None 时按患者信息与时间戳自动命名
+            timestamp: 自动命名使用的时间戳（YYYYMMDD_HHMMSS），默认为当前时间
+        """
         if self.config.get("create_from_blank"):
-            return self._generate_from_blank(json_data, output_path)
+            return self._generate_from_blank(json_data, output_path, timestamp)
+
+        plan = self.get_plan()
+
+        # 在写入前应用通用的“N/A补齐”规则（由模板JSON中的 na_fill_groups 开关驱动）
+        self._apply_compiled_na_fill(json_data, plan.na_groups)
+        values = [(compiled, self._resolve_compiled(compiled, json_data)) for compiled in plan.cells]
+
+        content = None
+        if plan.patch is not None:
+            try:
+                content = plan.patch.render({compiled.coordinate: value for compiled, value in values})
+            except UnsupportedValue:
+                content = None
+        if content is None:
+            if plan.prepared is not None:
+                wb = pickle.loads(plan.prepared)
+                ws = _select_sheet(wb, plan.sheet_name)
+            else:
+                wb, ws, _ = self._prepare_workbook(self._resolve_template_path())
+            for compiled, value in values:
+                ws.cell(row=compiled.row, column=compiled.column).value = value
+
+        suffix = (
+            self.template_id if self.template_id and self.template_id != "default_template" else None
+        )
+        output_path = self._build_output_path(json_data, output_path, suffix=suffix, timestamp=timestamp)
+        # 若已存在同名文件，先删除再保存，避免覆盖异常
+        try:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        except Exception:
+            pass
+        if content is not None:
+            with open(output_path, "wb") as f:
+                f.write(content)
+        else:
+            wb.save(output_path)
+        return output_path
+
+    @staticmethod
+    def generate_many(reports, template_ids=None, workers=None, database_path="vest_database", cancel=None):
+        """
+        批量生成Excel报告：每份报告按每个模板展开为一项任务，分发到进程池并行生成，按完成顺序逐项产出结果
+
+        每个工作进程缓存各模板的生成器与执行计划，同一进程内同一模板只编译一次；
+        提交的任务数不超过进程数的两倍，因此 reports 可以是流式迭代器。单项失败不影响其它报告。
+        标识是报告文件路径时，输出文件名使用报告文件名中的时间戳，同一秒内生成的同一患者的多份报告不会互相覆盖。
+
+        Args:
+            reports: 可迭代的 (标识, 报告数据)，标识（如报告文件路径）原样返回
+            template_ids: 模板ID列表，None 表示默认模板
+            workers: 工作进程数，None 为CPU核数，1 表示在当前进程内依次生成
+            database_path: 数据库路径
+            cancel: threading.Event，置位后停止提交并取消尚未开始的任务
+
+        Yields:
+            {"key": 标识, "template_id": 模板ID, "output_path": 输出路径, "error": 错误信息}
+            （成功时 error 为None，失败时 output_path 为None）
+        """
+        template_ids = list(template_ids) if template_ids else [None]
+        tasks = ((key, template_id, data) for key, data in reports for template_id in template_ids)
+
+        def cancelled():
+            return cancel is not None and cancel.is_set()
 
+        if workers == 1:
+            for key, template_id, data in tasks:
+                if cancelled():
+                    return
+                try:
+                    # 同一报告可能依次用于多个模板，而生成会补齐N/A字段，因此传入副本
+                    output_path = _generate_batch_item(database_path, template_id, copy.deepcopy(data),
+                                                       _report_timestamp(key))
+                    yield _batch_result(key, template_id, output_path, None)
+                except Exception as e:
+                    yield _batch_result(key, template_id, None, str(e) or type(e).__name__)
+            return
+
+        workers = workers or os.cpu_count() or 1
+        # 用 spawn 启动工作进程：调用方（界面的后台线程）所在进程持有Tk、SQLite连接和其它线程的锁，
+        # fork 出的子进程可能继承到被占用的锁而死锁；spawn 也与 Windows 的行为一致
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_batch_worker) as executor:
+            pending = {}
+            exhausted = False
+            while True:
+                while not exhausted and not cancelled() and len(pending) < workers * 2:
+                    try:
+                        key, template_id, data = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = executor.submit(_generate_batch_item, database_path, template_id, data,
+                                             _report_timestamp(key))
+                    pending[future] = (key, template_id)
+                if cancelled():
+                    for future in pending:
+                        future.cancel()
+                    return
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, template_id = pending.pop(future)
+                    try:
+                        yield _batch_result(key, template_id, future.result(), None)
+                    except Exception as e:
+                        yield _batch_result(key, template_id, None, str(e) or type(e).__name__)
+
+    def _resolve_template_path(self):
+        """解析模板xlsx文件路径"""
         template_path = self.config.get("template_file", "template/report_template.xlsx")
 
         if not os.path.isabs(template_path) and not os.path.exists(template_path):
@@ -278,48 +625,89 @@ class ExcelGenerator:
 
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"模板文件不存在: {template_path}")
+        return template_path
 
-        wb = load_workbook(template_path)
+    def get_plan(self):
+        """
+        获取当前模板的执行计划（按配置文件与模板文件的版本缓存）
+
+        Returns:
+            TemplatePlan
+        """
+        template_path = self._resolve_template_path()
+        config_key = os.path.abspath(self.config_path)
+        template_key = os.path.abspath(template_path)
+        key = (config_key, _file_signature(config_key), template_key, _file_signature(template_key))
+        with _cache_lock:
+            plan = _plan_cache.get(key)
+        if plan is None:
+            plan = self._compile_plan(template_path)
+            with _cache_lock:
+                # 同一模板只保留最新版本的计划
+                for stale in [k for k in _plan_cache if k[0] == config_key and k[2] == template_key]:
+                    del _plan_cache[stale]
+                _plan_cache[key] = plan
+        return plan
+
+    def _compile_plan(self, template_path):
+        """
+        将 data_cells 编译为执行计划：在模板副本上按配置顺序完成合并、解析写入目标（合并区域的主单元格）、
+        应用样式与页面设置，保存为序列化副本；这些都与报告数据无关，每个模板版本只做一次
+        """
+        wb, _, cells = self._prepare_workbook(template_path)
+        na_groups = []
+        for group in self.config.get("na_fill_groups", []) or []:
+            data_paths = group.get("data_paths", []) if isinstance(group, dict) else []
+            if data_paths:
+                na_groups.append((tuple(_split_path(p) for p in data_paths), group.get("fill_value", "N/A")))
+        try:
+            prepared = pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            prepared = None
+        patch = None
+        if self.config.get("generation_backend") == "xml_patch":
+            # 预处理后的模板保存一次，作为直接补丁的底稿
+            buffer = io.BytesIO()
+            wb.save(buffer)
+            try:
+                patch = XlsxPatchTemplate(
+                    buffer.getvalue(), _select_sheet(wb, self.config.get("sheet_name")).title,
+                    [compiled.coordinate for compiled in cells]
+                )
+            except Exception as e:
+                print(f"模板无法使用XML直接补丁，改用openpyxl生成: {e}")
+        return TemplatePlan(cells, na_groups, self.config.get("sheet_name"), prepared, patch)
+
+    def _prepare_workbook(self, template_path):
+        """
+        加载模板并应用与报告数据无关的部分（合并、样式、页面设置）
+
+        Returns:
+            (工作簿, 工作表, 编译后的单元格列表)
+        """
+        wb = load_template_workbook(template_path)
         sheet_name = self.config.get("sheet_name")
-        if sheet_name and sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-        else:
-            ws = wb.active
+        ws = _select_sheet(wb, sheet_name)
         self._clear_template_sheet(ws)
 
-        # 在写入前应用通用的“N/A补齐”规则（由模板JSON中的 na_fill_groups 开关驱动）
-        self._apply_na_fill_rules(json_data, self.config.get("na_fill_groups", []))
-
+        cells = []
         for data_cell in self.config.get("data_cells", []):
-            coord = data_cell.get("range") or data_cell.get("cell")
-            if not coord:
+            compiled = CompiledCell(data_cell, self._empty_default)
+            if not compiled.range:
                 continue
-            target_coord = self._apply_cell_range(ws, coord)
+            target_coord = self._apply_cell_range(ws, compiled.range)
             cell = ws[target_coord]
             if isinstance(cell, MergedCell):
                 cell = self._get_merged_master_cell(ws, target_coord)
-            value = self._resolve_data_value(data_cell, json_data)
-            cell.value = value
-            style_name = data_cell.get("style")
-            if style_name:
-                self._apply_style(cell, style_name)
+            compiled.coordinate, compiled.row, compiled.column = cell.coordinate, cell.row, cell.column
+            if compiled.style:
+                self._apply_style(cell, compiled.style)
+            cells.append(compiled)
 
         self._apply_page_setup(ws, self.config.get("page_setup", {}))
+        return wb, ws, cells
 
-        suffix = (
-            self.template_id if self.template_id and self.template_id != "default_template" else None
-        )
-        output_path = self._build_output_path(json_data, output_path, suffix=suffix)
-        # 若已存在同名文件，先删除再保存，避免覆盖异常
-        try:
-            if os.path.exists(output_path):
-                os.remove(output_path)
-        except Exception:
-            pass
-        wb.save(output_path)
-        return output_path
-
-    def _generate_from_blank(self, json_data, output_path=None):
+    def _generate_from_blank(self, json_data, output_path=None, timestamp=None):
         wb = Workbook()
         ws = wb.active
         ws.title = self.config.get("sheet_name", "Sheet1")
@@ -361,11 +749,12 @@ class ExcelGenerator:
             output_path,
             suffix=suffix,
             use_date_folder=True,
+            timestamp=timestamp,
         )
         wb.save(output_path)
         return output_path
 
-    def _build_output_path(self, json_data, output_path, *, suffix=None, use_date_folder=False):
+    def _build_output_path(self, json_data, output_path, *, suffix=None, use_date_folder=False, timestamp=None):
         if output_path:
             return output_path
 
@@ -382,7 +771,7 @@ class ExcelGenerator:
 
         os.makedirs(output_dir, exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
         patient_name = self._get_data_value(json_data, "基本信息.姓名") or "unknown"
         patient_id = self._get_data_value(json_data, "基本信息.ID") or "unknown"
 
@@ -402,31 +791,32 @@ class ExcelGenerator:
             raise ValueError("单元格范围不能为空")
         if ":" in cell_range:
             worksheet.merge_cells(cell_range)
+            index = self._merged_indexes.get(worksheet)
+            if index is not None:
+                index.add(*range_boundaries(cell_range))
             start = cell_range.split(":")[0]
         else:
             start = cell_range
         return start
 
     def _resolve_data_value(self, cell_config, data):
+        return self._resolve_compiled(CompiledCell(cell_config, self._empty_default), data)
+
+    def _resolve_compiled(self, compiled, data):
+        """按编译后的单元格规则从报告数据取值"""
         # 1) presence_from_list: 通用规则——若列表包含指定值则返回 present_value，否则 absent_value
-        presence_cfg = cell_config.get("presence_from_list")
-        if presence_cfg:
-            source_path = presence_cfg.get("source_path", "")
-            includes = presence_cfg.get("includes", [])
-            present_value = presence_cfg.get("present_value", "√")
-            absent_value = presence_cfg.get("absent_value", "")
-            # 可选：当同组任意值存在而当前includes不命中时，用特定缺省（例如 "N/A"）
-            group_includes = presence_cfg.get("group_includes", [])
-            absent_when_group_present = presence_cfg.get("absent_value_when_group_present")
-            source_value = self._get_data_value(data, source_path)
+        if compiled.presence:
+            source_keys, includes, group_includes, present_value, absent_value, absent_when_group_present = \
+                compiled.presence
+            source_value = self._get_value_by_keys(data, source_keys)
             if isinstance(source_value, list):
-                # 兼容字符串
-                if isinstance(includes, str):
-                    includes_list = [includes]
-                else:
-                    includes_list = list(includes) if includes else []
-                present = any(item in source_value for item in includes_list)
-                group_present = any(item in source_value for item in (group_includes or []))
+                try:
+                    present = not includes.isdisjoint(source_value)
+                    # 可选：当同组任意值存在而当前includes不命中时，用特定缺省（例如 "N/A"）
+                    group_present = not group_includes.isdisjoint(source_value)
+                except TypeError:
+                    present = any(item in source_value for item in includes)
+                    group_present = any(item in source_value for item in group_includes)
             else:
                 present = False
                 group_present = False
@@ -436,23 +826,17 @@ class ExcelGenerator:
                 return absent_when_group_present
             return absent_value
 
-        paths = cell_config.get("paths")
         value = ""
+        for keys in compiled.paths:
+            value = self._get_value_by_keys(data, keys)
+            if not self._is_empty(value):
+                break
 
-        if paths:
-            for path in paths:
-                value = self._get_data_value(data, path)
-                if not self._is_empty(value):
-                    break
-        else:
-            value = self._get_data_value(data, cell_config.get("data_path", ""))
-
-        value_type = cell_config.get("value_type")
-        if value_type == "main_with_note":
-            secondary = self._get_data_value(data, cell_config.get("secondary_path", ""))
+        if compiled.value_type == "main_with_note":
+            secondary = self._get_value_by_keys(data, compiled.secondary)
             value = self._merge_main_and_secondary(value, secondary)
 
-        format_type = cell_config.get("format")
+        format_type = compiled.format
         if isinstance(value, dict):
             if format_type == "list":
                 if "检查结论" in value and isinstance(value["检查结论"], list):
@@ -467,10 +851,7 @@ class ExcelGenerator:
             value = self._format_value(value, format_type)
 
         if self._is_empty(value):
-            value = cell_config.get(
-                "default",
-                self.config.get("empty_value_handling", {}).get("default", ""),
-            )
+            value = compiled.default
 
         return value
 
@@ -484,11 +865,11 @@ class ExcelGenerator:
         return f"{main}（{secondary}）"
 
     def _get_merged_master_cell(self, worksheet, coord):
-        for merged_range in worksheet.merged_cells.ranges:
-            if coord in merged_range:
-                start = str(merged_range).split(":")[0]
-                return worksheet[start]
-        return worksheet[coord]
+        index = self._merged_indexes.get(worksheet)
+        if index is None:
+            index = self._merged_indexes[worksheet] = MergedCellIndex(worksheet)
+        row, column = index.master(*coordinate_to_tuple(coord))
+        return worksheet.cell(row=row, column=column)
 
     def _clear_template_sheet(self, worksheet):
         pass
@@ -503,27 +884,20 @@ class ExcelGenerator:
             cur = cur[key]
         cur[keys[-1]] = new_value
 
-    def _apply_na_fill_rules(self, data: dict, groups: list) -> None:
+    def _apply_compiled_na_fill(self, data: dict, na_groups: list) -> None:
         """
-        通用“N/A补齐”规则（由模板JSON配置 na_fill_groups 驱动）：
-        - 对每个分组（data_paths 列表），若组内部分有值且部分为空，则将空值补为 fill_value（默认"N/A"）
+        通用“N/A补齐”规则（由模板JSON配置 na_fill_groups 驱动，分组路径在编译执行计划时已拆分）：
+        - 对每个分组，若组内部分有值且部分为空，则将空值补为 fill_value（默认"N/A"）
         - 若组内全部为空，则不处理
         """
-        if not groups:
-            return
-        for group in groups:
+        for key_paths, fill_value in na_groups:
             try:
-                data_paths = group.get("data_paths", [])
-                if not data_paths:
-                    continue
-                fill_value = group.get("fill_value", "N/A")
-                values = [self._get_data_value(data, p) for p in data_paths]
-                has_any = any(not self._is_empty(v) for v in values)
-                all_empty = all(self._is_empty(v) for v in values)
-                if has_any and not all_empty:
-                    for p in data_paths:
-                        if self._is_empty(self._get_data_value(data, p)):
-                            self._set_data_value(data, p, fill_value)
+                values = [self._get_value_by_keys(data, keys) for keys in key_paths]
+                empty = [self._is_empty(v) for v in values]
+                if not all(empty) and any(empty):
+                    for keys, is_empty in zip(key_paths, empty):
+                        if is_empty:
+                            self._set_data_value(data, ".".join(keys), fill_value)
             except Exception:
                 continue
 
@@ -680,6 +1054,40 @@ class ExcelGenerator:
             ws.print_area = f"{base_col}1:{end_col}{current_row}"
 
 
+# 批量生成：每个进程按 (数据库路径, 模板ID) 缓存生成器，模板执行计划随之在进程内复用
+_batch_generators = {}
+
+# 报告文件名中的时间戳，如 001_20251121_164346.json
+_REPORT_TIMESTAMP_RE = re.compile(r"(\d{8}_\d{6})(?:\.json)?$")
+
+
+def _report_timestamp(key):
+    match = _REPORT_TIMESTAMP_RE.search(os.path.basename(key)) if isinstance(key, str) else None
+    return match.group(1) if match else None
+
+
+def _init_batch_worker():
+    """工作进程初始化：从空缓存开始，模板、配置与执行计划在本进程内首次使用时重新加载"""
+    _batch_generators.clear()
+    with _cache_lock:
+        _json_cache.clear()
+        _template_cache.clear()
+        _plan_cache.clear()
+
+
+def _generate_batch_item(database_path, template_id, data, timestamp=None):
+    """批量生成的单项任务（在工作进程中执行），返回输出路径"""
+    key = (database_path, template_id)
+    generator = _batch_generators.get(key)
+    if generator is None:
+        generator = _batch_generators[key] = ExcelGenerator(database_path=database_path, template_id=template_id)
+    return generator.generate(data, timestamp=timestamp)
+
+
+def _batch_result(key, template_id, output_path, error):
+    return {"key": key, "template_id": template_id, "output_path": output_path, "error": error}
+
+
 if __name__ == "__main__":
     # 测试代码
     generator = ExcelGenerator(database_path="vest_database", template_id="default_template")
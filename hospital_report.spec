@@ -23,6 +23,12 @@ a = Analysis(
         # JSON 页面配置
         ('pages/*.json', 'pages'),
 
+        # 姓名拼音检索用的汉字拼音表
+        ('pinyin_table.json', '.'),
+
+        # 紧凑存储格式的报告键字典
+        ('report_keys.json', '.'),
+
         # 报告模板及配置
         ('vest_database/templates/*', 'vest_database/templates'),
 
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import json
+import multiprocessing
 import os
 from datetime import datetime
 import subprocess
@@ -569,5 +570,7 @@ class VestibularFunctionReport:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，批量生成报告的工作进程需要由此进入
+    multiprocessing.freeze_support()
     app = VestibularFunctionReport()
     app.run()
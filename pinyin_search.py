@@ -0,0 +1,78 @@
+"""
+拼音检索模块 - 基于内置汉字拼音表（pinyin_table.json，离线可用）
+为患者姓名生成全拼与首字母检索键，如 王一冲 -> wangyichong / wyc
+"""
+import itertools
+import json
+import os
+from typing import Dict, List, Optional, Set
+
+
+PINYIN_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinyin_table.json")
+
+# 多音字组合上限，避免生僻多音字姓名产生组合爆炸
+MAX_NAME_VARIANTS = 16
+
+_char_readings: Optional[Dict[str, List[str]]] = None
+
+
+def _load_char_readings() -> Dict[str, List[str]]:
+    """加载拼音表并转为 汉字 -> 读音列表（懒加载，进程内只读一次）"""
+    global _char_readings
+    if _char_readings is None:
+        readings: Dict[str, List[str]] = {}
+        try:
+            with open(PINYIN_TABLE_PATH, "r", encoding="utf-8") as f:
+                table = json.load(f).get("readings", {})
+            for reading, chars in table.items():
+                for ch in chars:
+                    readings.setdefault(ch, []).append(reading)
+        except Exception as e:
+            print(f"加载拼音表失败 {PINYIN_TABLE_PATH}: {e}")
+        _char_readings = readings
+    return _char_readings
+
+
+def char_readings(ch: str) -> List[str]:
+    """
+    获取单个字符的拼音读音
+
+    Args:
+        ch: 单个字符
+
+    Returns:
+        读音列表；非汉字返回其小写形式（字母数字），其余字符返回空列表
+    """
+    readings = _load_char_readings().get(ch)
+    if readings:
+        return readings
+    if ch.isascii() and ch.isalnum():
+        return [ch.lower()]
+    return []
+
+
+def name_search_keys(name: str) -> Set[str]:
+    """
+    生成姓名的拼音检索键：从每个字开始的全拼串与首字母串
+
+    以每个字为起点生成后缀键，使 "yichong"、"yc" 这类从名字中间开始的输入也能按前缀命中。
+
+    Args:
+        name: 患者姓名
+
+    Returns:
+        检索键集合（小写）
+    """
+    per_char = [r for r in (char_readings(ch) for ch in name) if r]
+    keys: Set[str] = set()
+    for start in range(len(per_char)):
+        combos = itertools.islice(itertools.product(*per_char[start:]), MAX_NAME_VARIANTS)
+        for combo in combos:
+            keys.add("".join(combo))
+            keys.add("".join(reading[0] for reading in combo))
+    return keys
+
+
+def is_pinyin_query(text: str) -> bool:
+    """判断输入是否可作为拼音检索（纯ASCII字母）"""
+    return bool(text) and text.isascii() and text.isalpha()
@@ -0,0 +1,156 @@
+"""
+报告编码模块 - 报告在存储中的序列化格式
+
+- 标准格式：完整JSON，缩进2（默认，便于人工查看）
+- 紧凑格式（database.compact_format.enabled）：去掉空字段、无缩进，
+  外层为 {"__format__": "compact", "version": 1, "data": {...}}，读取时按页面定义补回空字段；
+  启用 key_dictionary 时页面/字段名按 report_keys.json 编码为短ID：
+  {"__format__": "compact", "version": 2, "keys": 字典版本, "data": {...}}
+- 冷数据压缩：日期文件夹早于 compress_after_days 天的报告以 gzip/lzma 压缩保存（文件名不变）
+
+读取时按内容自动识别格式，与配置无关，因此各种格式的报告可以混存。
+"""
+import gzip
+import json
+import lzma
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from report_keys import KeyDictionary, get_key_dictionary
+from report_schema import ReportSchema, get_report_schema
+
+
+COMPACT_FORMAT = "compact"
+COMPACT_VERSION = 1
+# 键名按键字典编码的紧凑格式
+COMPACT_KEYED_VERSION = 2
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+COMPRESSIONS = ("gzip", "lzma")
+
+
+class ReportCodec:
+    """报告编解码器"""
+
+    def __init__(self, options: Optional[Dict] = None, schema: Optional[ReportSchema] = None,
+                 key_dictionary: Optional[KeyDictionary] = None):
+        """
+        初始化编解码器
+
+        Args:
+            options: 紧凑格式配置（config["database"]["compact_format"]），
+                     支持 enabled、key_dictionary、compression（gzip/lzma）、compress_after_days
+            schema: 报告结构，默认由 pages/*.json 编译
+            key_dictionary: 键字典，默认为内置的 report_keys.json
+        """
+        options = options or {}
+        self.compact = bool(options.get("enabled", False))
+        self.encode_keys = bool(options.get("key_dictionary", False))
+        self.compression = options.get("compression") or None
+        if self.compression is not None and self.compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {self.compression}（可选: {', '.join(COMPRESSIONS)}）")
+        days = options.get("compress_after_days")
+        self.compress_after_days = int(days) if days is not None else None
+        self._schema = schema
+        self._key_dictionary = key_dictionary
+
+    @property
+    def schema(self) -> ReportSchema:
+        if self._schema is None:
+            self._schema = get_report_schema()
+        return self._schema
+
+    @property
+    def key_dictionary(self) -> KeyDictionary:
+        if self._key_dictionary is None:
+            self._key_dictionary = get_key_dictionary()
+        return self._key_dictionary
+
+    def encode(self, data: Dict) -> str:
+        """
+        按配置序列化报告
+
+        Args:
+            data: 报告数据
+
+        Returns:
+            JSON文本
+        """
+        if not self.compact:
+            return json.dumps(data, ensure_ascii=False, indent=2)
+        sparse = self.schema.strip_empty(data)
+        if self.encode_keys:
+            wrapped = {
+                "__format__": COMPACT_FORMAT,
+                "version": COMPACT_KEYED_VERSION,
+                "keys": self.key_dictionary.version,
+                "data": self.key_dictionary.encode(sparse),
+            }
+        else:
+            wrapped = {"__format__": COMPACT_FORMAT, "version": COMPACT_VERSION, "data": sparse}
+        return json.dumps(wrapped, ensure_ascii=False, separators=(",", ":"))
+
+    def decode_object(self, obj: Any) -> Dict:
+        """将解析后的JSON对象还原为报告数据（识别紧凑格式）"""
+        if isinstance(obj, dict) and obj.get("__format__") == COMPACT_FORMAT:
+            sparse = obj.get("data") or {}
+            if obj.get("version") == COMPACT_KEYED_VERSION:
+                sparse = self.key_dictionary.decode(sparse)
+            return self.schema.fill_defaults(sparse)
+        return obj
+
+    def decode(self, text: str) -> Dict:
+        """
+        解析JSON文本为报告数据
+
+        Args:
+            text: JSON文本
+
+        Returns:
+            报告数据
+        """
+        return self.decode_object(json.loads(text))
+
+    def decode_bytes(self, raw: bytes) -> Dict:
+        """
+        解析文件内容为报告数据（自动识别 gzip/lzma 压缩）
+
+        Args:
+            raw: 文件内容
+
+        Returns:
+            报告数据
+        """
+        if raw.startswith(_GZIP_MAGIC):
+            raw = gzip.decompress(raw)
+        elif raw.startswith(_XZ_MAGIC):
+            raw = lzma.decompress(raw)
+        return self.decode(raw.decode("utf-8-sig"))
+
+    def is_cold(self, date_folder: str) -> bool:
+        """日期文件夹是否已达到冷数据压缩的天数（压缩属于紧凑格式的一部分，未启用时不压缩）"""
+        if not self.compact or self.compression is None or self.compress_after_days is None:
+            return False
+        cutoff = (datetime.now() - timedelta(days=self.compress_after_days)).strftime("%Y-%m-%d")
+        return date_folder < cutoff
+
+    def encode_file(self, data: Dict, date_folder: str) -> bytes:
+        """
+        序列化为文件内容（冷数据按配置压缩）
+
+        Args:
+            data: 报告数据
+            date_folder: 报告所在日期文件夹名
+
+        Returns:
+            文件内容
+        """
+        raw = self.encode(data).encode("utf-8")
+        if not self.is_cold(date_folder):
+            return raw
+        if self.compression == "gzip":
+            # 固定 mtime，使相同内容的压缩结果一致（重复整理时可跳过未变化的文件）
+            return gzip.compress(raw, mtime=0)
+        return lzma.compress(raw)
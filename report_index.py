@@ -0,0 +1,836 @@
+"""
+报告索引模块 - 在数据库目录下维护报告元数据的持久化索引（SQLite）
+列表、排序直接读取索引，无需逐个解析报告JSON；
+通过日期文件夹与文件的 stat 指纹增量对账，仅重新解析发生变化的文件；
+同时维护全字段倒排索引（中文按单字+二元组切分），支持在报告内容中快速搜索，
+以及姓名的拼音/首字母检索键
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pinyin_search import is_pinyin_query, name_search_keys
+
+
+INDEX_FILENAME = "report_index.db"
+
+# 索引结构版本号：结构变化时递增，旧索引会被自动丢弃并重建
+SCHEMA_VERSION = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY,
+    rel_path    TEXT NOT NULL UNIQUE,
+    date_folder TEXT NOT NULL,
+    patient_id  TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    exam_time   TEXT NOT NULL,
+    sort_ts     REAL NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    ino         INTEGER NOT NULL DEFAULT 0,
+    valid       INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_reports_sort ON reports (sort_ts DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_folder ON reports (date_folder);
+CREATE INDEX IF NOT EXISTS idx_reports_patient ON reports (patient_id, sort_ts, id);
+CREATE INDEX IF NOT EXISTS idx_reports_name ON reports (name);
+CREATE INDEX IF NOT EXISTS idx_reports_exam_time ON reports (exam_time);
+CREATE TABLE IF NOT EXISTS folders (
+    date_folder TEXT PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term      TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (term, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_terms_report ON terms (report_id);
+CREATE TABLE IF NOT EXISTS report_text (
+    report_id INTEGER PRIMARY KEY,
+    body      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS name_keys (
+    key       TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (key, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_name_keys_report ON name_keys (report_id);
+CREATE TABLE IF NOT EXISTS field_values (
+    field     TEXT NOT NULL,
+    value     TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (field, value, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_field_values_report ON field_values (report_id);
+"""
+
+# 依附于 reports.id 的表，删除报告时需一并清理
+_DEPENDENT_TABLES = ("terms", "report_text", "name_keys", "field_values")
+
+# 索引自身拥有的表；结构升级时只丢弃这些表（同一SQLite文件中可能还有报告正文等数据）
+_OWNED_TABLES = ("meta", "reports", "folders") + _DEPENDENT_TABLES
+
+# 基本信息字段与 reports 表列的对应（列中保存的是列表显示值，缺失为"未知"，故只支持等值查询）
+_PATH_COLUMNS = {"ID": "patient_id", "姓名": "name", "检查时间": "exam_time"}
+
+# reports 表列中字段缺失时的占位值；占位值（以及 null 字段的显示值 "None"）无法与同名的真实值区分，
+# 以它们为字面量的条件不能交给索引
+_MISSING_PLACEHOLDER = "未知"
+_AMBIGUOUS_COLUMN_VALUES = frozenset({_MISSING_PLACEHOLDER, "None"})
+
+_SQL_OPERATORS = {"==": "="}
+
+# 二级索引（field_values 表保存字段原值，多选字段每个选项一行，空值不入索引）支持的运算符
+_FIELD_SQL_OPERATORS = {
+    "==": "value = ?",
+    "!=": "value = ?",
+    "<": "value < ?",
+    "<=": "value <= ?",
+    ">": "value > ?",
+    ">=": "value >= ?",
+    "contains": "instr(value, ?) > 0",
+}
+
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD_RE = re.compile(r"[0-9a-z]+")
+# 英文/数字词按后缀入索引以支持子串匹配（如ID片段），超长词只取前若干个后缀
+_MAX_WORD_SUFFIXES = 32
+
+
+def parse_filename_timestamp(file_name: str) -> Optional[float]:
+    """
+    从文件名 患者ID_YYYYMMDD_HHMMSS.json 中解析时间戳（精确到秒）
+
+    Args:
+        file_name: 报告文件名（可带路径）
+
+    Returns:
+        时间戳，解析失败返回None
+    """
+    name = os.path.basename(file_name).split(".", 1)[0]
+    parts = name.split("_")
+    if len(parts) < 3:
+        return None
+    day, clock = parts[-2], parts[-1]
+    if len(day) != 8 or len(clock) != 6 or not (day + clock).isdigit():
+        return None
+    try:
+        return datetime(
+            int(day[0:4]), int(day[4:6]), int(day[6:8]),
+            int(clock[0:2]), int(clock[2:4]), int(clock[4:6])
+        ).timestamp()
+    except ValueError:
+        return None
+
+
+def tokenize_text(text: str) -> Set[str]:
+    """
+    将报告文本切分为倒排索引词项：
+    - 中文连续片段：单字 + 相邻二元组
+    - 英文/数字词：转小写后取全部后缀（支持子串查询）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项集合
+    """
+    text = text.lower()
+    tokens: Set[str] = set()
+    for run in _CJK_RE.findall(text):
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    for word in _WORD_RE.findall(text):
+        tokens.update(word[i:] for i in range(min(len(word), _MAX_WORD_SUFFIXES)))
+    return tokens
+
+
+def tokenize_query(term: str) -> List[Tuple[str, bool]]:
+    """
+    将单个查询词切分为 (词项, 是否前缀匹配) 列表
+
+    中文片段按二元组精确匹配（单字片段按单字匹配），英文/数字按前缀匹配后缀词项。
+    """
+    term = term.lower()
+    tokens: List[Tuple[str, bool]] = []
+    for run in _CJK_RE.findall(term):
+        if len(run) == 1:
+            tokens.append((run, False))
+        else:
+            tokens.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+    for word in _WORD_RE.findall(term):
+        tokens.append((word, True))
+    return tokens
+
+
+class ReportIndex:
+    """报告元数据索引 - 保存 患者ID/姓名/检查时间/文件路径/mtime/size"""
+
+    def __init__(self, report_folder: str, index_path: str):
+        """
+        初始化索引
+
+        Args:
+            report_folder: 报告根目录（db_path/report）
+            index_path: 索引文件路径
+        """
+        self.report_folder = report_folder
+        self.index_path = index_path
+        # 索引可能被界面线程之外的线程访问，统一加锁串行化
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """创建表结构；版本不一致时丢弃旧索引"""
+        with self._lock:
+            version = None
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM meta WHERE key='schema_version'"
+                ).fetchone()
+                version = row["value"] if row else None
+            except sqlite3.DatabaseError:
+                pass
+            if version != str(SCHEMA_VERSION):
+                with self._conn:
+                    for table in _OWNED_TABLES:
+                        self._conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                    (str(SCHEMA_VERSION),)
+                )
+
+    @contextmanager
+    def transaction(self):
+        """
+        事务上下文（可嵌套，最外层退出时提交）；存储后端可借此把自身数据与索引放在同一事务中
+
+        Yields:
+            SQLite连接
+        """
+        with self._lock:
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._tx_depth -= 1
+                return
+            self._tx_depth = 1
+            try:
+                with self._conn:
+                    yield self._conn
+            finally:
+                self._tx_depth = 0
+
+    @property
+    def transaction_depth(self) -> int:
+        """当前事务的嵌套层数（0 表示不在事务中）"""
+        return self._tx_depth
+
+    def close(self):
+        """关闭索引连接"""
+        with self._lock:
+            self._conn.close()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """读取索引元信息"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+            return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str):
+        """写入索引元信息"""
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def is_built(self) -> bool:
+        """索引是否已完成首次构建"""
+        return self.get_meta("built") == "1"
+
+    def rel_path(self, file_path: str) -> str:
+        """将报告文件路径转换为相对于报告根目录的路径（统一使用/分隔）"""
+        rel = os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.report_folder))
+        return rel.replace(os.sep, "/")
+
+    def abs_path(self, rel_path: str) -> str:
+        """将索引中的相对路径还原为报告文件路径"""
+        return os.path.join(self.report_folder, *rel_path.split("/"))
+
+    def _upsert_locked(self, file_path: str, metadata: Optional[Dict[str, str]],
+                       fingerprint: Optional[Tuple[int, int, int]] = None):
+        if fingerprint is None:
+            st = os.stat(file_path)
+            fingerprint = (st.st_mtime_ns, st.st_size, st.st_ino)
+        mtime_ns, size, ino = fingerprint
+        rel = self.rel_path(file_path)
+        sort_ts = parse_filename_timestamp(rel)
+        if sort_ts is None:
+            sort_ts = mtime_ns / 1e9
+        # metadata为None表示文件无法解析：仅记录指纹，避免每次对账重复解析
+        valid = 1 if metadata is not None else 0
+        metadata = metadata or {}
+        self._conn.execute(
+            """
+            INSERT INTO reports (rel_path, date_folder, patient_id, name, exam_time,
+                                 sort_ts, mtime_ns, size, ino, valid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(rel_path) DO UPDATE SET
+                date_folder=excluded.date_folder, patient_id=excluded.patient_id,
+                name=excluded.name, exam_time=excluded.exam_time, sort_ts=excluded.sort_ts,
+                mtime_ns=excluded.mtime_ns, size=excluded.size, ino=excluded.ino,
+                valid=excluded.valid
+            """,
+            (
+                rel,
+                rel.split("/", 1)[0],
+                metadata.get("patient_id", _MISSING_PLACEHOLDER),
+                metadata.get("name", _MISSING_PLACEHOLDER),
+                metadata.get("exam_time", _MISSING_PLACEHOLDER),
+                sort_ts,
+                mtime_ns,
+                size,
+                ino,
+                valid,
+            ),
+        )
+        report_id = self._conn.execute(
+            "SELECT id FROM reports WHERE rel_path=?", (rel,)
+        ).fetchone()["id"]
+        self._index_text_locked(report_id, rel, metadata.get("text", "") if valid else "")
+        self._conn.execute("DELETE FROM name_keys WHERE report_id=?", (report_id,))
+        if valid:
+            self._conn.executemany(
+                "INSERT INTO name_keys (key, report_id) VALUES (?, ?)",
+                ((key, report_id) for key in name_search_keys(metadata.get("name", "")))
+            )
+        self._conn.execute("DELETE FROM field_values WHERE report_id=?", (report_id,))
+        if valid:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO field_values (field, value, report_id) VALUES (?, ?, ?)",
+                ((field, value, report_id)
+                 for field, values in metadata.get("fields", {}).items() for value in values)
+            )
+
+    def _index_text_locked(self, report_id: int, rel: str, text: str):
+        """重建单个报告的倒排词项与检索文本"""
+        self._conn.execute("DELETE FROM terms WHERE report_id=?", (report_id,))
+        if not text:
+            self._conn.execute("DELETE FROM report_text WHERE report_id=?", (report_id,))
+            return
+        body = f"{rel}\n{text}".lower()
+        self._conn.executemany(
+            "INSERT INTO terms (term, report_id) VALUES (?, ?)",
+            ((token, report_id) for token in tokenize_text(body))
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO report_text (report_id, body) VALUES (?, ?)", (report_id, body)
+        )
+
+    def _delete_where_locked(self, where: str, params: Iterable) -> int:
+        """按条件删除报告及其依附数据，返回删除的报告数"""
+        params = tuple(params)
+        for table in _DEPENDENT_TABLES:
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE report_id IN (SELECT id FROM reports WHERE {where})",
+                params
+            )
+        return self._conn.execute(f"DELETE FROM reports WHERE {where}", params).rowcount
+
+    def upsert(self, file_path: str, metadata: Dict[str, str],
+               fingerprint: Optional[Tuple[int, int, int]] = None):
+        """
+        新增或更新一条报告索引
+
+        Args:
+            file_path: 报告文件路径（或存储后端中的报告键）
+            metadata: 元数据，包含 patient_id, name, exam_time，用于全文检索的 text，
+                      以及二级索引字段值 fields（{字段: [值, ...]}）
+            fingerprint: (mtime_ns, size, inode) 指纹；为None时从磁盘文件读取
+        """
+        with self.transaction():
+            self._upsert_locked(file_path, metadata, fingerprint)
+
+    def remove(self, file_path: str):
+        """删除一条报告索引"""
+        with self.transaction():
+            self._delete_where_locked("rel_path=?", (self.rel_path(file_path),))
+
+    def clear(self):
+        """清空索引内容（保留表结构）"""
+        with self.transaction():
+            for table in _DEPENDENT_TABLES + ("reports", "folders"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("DELETE FROM meta WHERE key='built'")
+
+    def mark_built(self):
+        """标记索引已完成首次构建"""
+        self.set_meta("built", "1")
+
+    def rebuild(self, read_metadata: Callable[[str], Optional[Dict[str, str]]]):
+        """
+        全量重建索引（仅在首次使用或索引结构变化时执行）
+
+        Args:
+            read_metadata: 读取单个报告元数据的函数，失败返回None
+        """
+        with self._lock:
+            self.clear()
+            self.reconcile(read_metadata, full=True)
+            self.mark_built()
+
+    def reconcile(self, read_metadata: Callable[[str], Optional[Dict[str, str]]],
+                  full: bool = False, is_archived: Optional[Callable[[str], bool]] = None) -> int:
+        """
+        增量对账：比较日期文件夹mtime与文件(mtime, size, inode)指纹，只重新解析变化的文件
+
+        Args:
+            read_metadata: 读取单个报告元数据的函数，失败返回None
+            full: 为True时忽略文件夹mtime，逐个比对所有文件指纹（可发现原地修改的文件）
+            is_archived: 判断报告（相对路径）是否已归档；已归档的报告磁盘上没有文件，对账时保留其索引
+
+        Returns:
+            发生变化（新增、修改、删除）的报告数量
+        """
+        changed = 0
+        with self.transaction():
+            known_folders = {
+                row["date_folder"]: row["mtime_ns"]
+                for row in self._conn.execute("SELECT date_folder, mtime_ns FROM folders")
+            }
+            seen_folders = set()
+            if os.path.isdir(self.report_folder):
+                with os.scandir(self.report_folder) as it:
+                    folder_entries = [e for e in it if e.is_dir()]
+                for entry in folder_entries:
+                    seen_folders.add(entry.name)
+                    # 先记录文件夹mtime再扫描，扫描期间的新增会在下次对账时被发现
+                    folder_mtime = entry.stat().st_mtime_ns
+                    if not full and known_folders.get(entry.name) == folder_mtime:
+                        continue
+                    changed += self._reconcile_folder_locked(entry.path, entry.name, read_metadata,
+                                                             is_archived)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO folders (date_folder, mtime_ns) VALUES (?, ?)",
+                        (entry.name, folder_mtime)
+                    )
+            for gone in set(known_folders) - seen_folders:
+                if is_archived is None:
+                    changed += self._delete_where_locked("date_folder=?", (gone,))
+                else:
+                    for row in self._conn.execute(
+                        "SELECT rel_path FROM reports WHERE date_folder=?", (gone,)
+                    ).fetchall():
+                        if not is_archived(row["rel_path"]):
+                            changed += self._delete_where_locked("rel_path=?", (row["rel_path"],))
+                self._conn.execute("DELETE FROM folders WHERE date_folder=?", (gone,))
+        return changed
+
+    def _reconcile_folder_locked(self, folder_path: str, date_folder: str,
+                                 read_metadata: Callable[[str], Optional[Dict[str, str]]],
+                                 is_archived: Optional[Callable[[str], bool]] = None) -> int:
+        """对账单个日期文件夹"""
+        stored = {
+            row["rel_path"]: (row["mtime_ns"], row["size"], row["ino"])
+            for row in self._conn.execute(
+                "SELECT rel_path, mtime_ns, size, ino FROM reports WHERE date_folder=?",
+                (date_folder,)
+            )
+        }
+        changed = 0
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                rel = f"{date_folder}/{entry.name}"
+                st = entry.stat()
+                fingerprint = (st.st_mtime_ns, st.st_size, entry.inode())
+                if stored.pop(rel, None) == fingerprint:
+                    continue
+                self._upsert_locked(entry.path, read_metadata(entry.path), fingerprint)
+                changed += 1
+        for rel in stored:
+            if is_archived is not None and is_archived(rel):
+                continue
+            changed += self._delete_where_locked("rel_path=?", (rel,))
+        return changed
+
+    def forget_folder(self, date_folder: str):
+        """不再跟踪某个日期文件夹的mtime（文件夹被整体归档后调用，其报告索引保留）"""
+        with self.transaction():
+            self._conn.execute("DELETE FROM folders WHERE date_folder=?", (date_folder,))
+
+    def _row_to_report(self, row: sqlite3.Row) -> Dict:
+        return {
+            "file_path": self.abs_path(row["rel_path"]),
+            "patient_id": row["patient_id"],
+            "name": row["name"],
+            "exam_time": row["exam_time"],
+            "date_folder": row["date_folder"],
+            "mtime_ns": row["mtime_ns"],
+            "size": row["size"],
+        }
+
+    def list_rows(self) -> List[Dict]:
+        """
+        按文件名时间戳从新到旧返回所有报告元数据
+
+        Returns:
+            报告列表，每个报告包含 file_path, patient_id, name, exam_time, date_folder, mtime_ns, size
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM reports WHERE valid=1 ORDER BY sort_ts DESC, id DESC"
+            ).fetchall()
+        return [self._row_to_report(row) for row in rows]
+
+    def patient_rows(self, patient_id: str) -> List[Dict]:
+        """
+        按时间从旧到新返回某患者的全部报告（患者索引按 (患者ID, 时间戳) 有序，代价与就诊次数成正比）
+
+        Args:
+            patient_id: 患者ID
+
+        Returns:
+            报告列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM reports WHERE patient_id=? AND valid=1 ORDER BY sort_ts, id",
+                (str(patient_id),)
+            ).fetchall()
+        return [self._row_to_report(row) for row in rows]
+
+    def _match_term_locked(self, term: str) -> Optional[Set[int]]:
+        """返回包含查询词的报告ID集合；无可用词项时返回None"""
+        candidates: Optional[Set[int]] = None
+        # 先查命中数少的词项，交集尽快收缩
+        for token, prefix in sorted(tokenize_query(term), key=lambda t: (t[1], -len(t[0]))):
+            if prefix:
+                rows = self._conn.execute(
+                    "SELECT DISTINCT report_id FROM terms WHERE term >= ? AND term < ?",
+                    (token, token + "\uffff")
+                )
+            else:
+                rows = self._conn.execute("SELECT report_id FROM terms WHERE term=?", (token,))
+            ids = {row[0] for row in rows}
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return candidates
+
+    def search(self, search_text: str, within: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        全字段搜索（空格分隔的多个词需同时命中）
+
+        先用倒排索引求候选集，再以检索文本做子串校验，排除二元组拼接造成的误命中；
+        纯字母的查询词同时按姓名拼音/首字母前缀匹配。
+
+        Args:
+            search_text: 搜索关键词
+            within: 只在这些报告（文件路径）中搜索。边输入边搜索时，关键词在上一次的基础上追加字符，
+                    结果必然是上一次结果的子集，此时直接校验上一次的结果，不再查倒排索引
+
+        Returns:
+            匹配的报告列表（按文件名时间戳从新到旧）
+        """
+        terms = [t.lower() for t in search_text.split() if t]
+        if not terms:
+            return self.list_rows() if within is None else self._rows_by_paths(within)
+        with self._lock:
+            if within is not None:
+                return self._refine_locked(self._ids_by_paths_locked(within), terms)
+            result: Optional[Set[int]] = None
+            for term in terms:
+                candidates = self._match_term_locked(term)
+                if candidates is None:
+                    # 查询词不含可索引字符（如纯符号），退回检索文本扫描
+                    rows = self._conn.execute(
+                        "SELECT report_id FROM report_text WHERE instr(body, ?) > 0", (term,)
+                    )
+                    candidates = {row[0] for row in rows}
+                elif candidates:
+                    candidates = self._verify_locked(candidates, term)
+                if is_pinyin_query(term):
+                    candidates |= self._match_name_pinyin_locked(term)
+                result = candidates if result is None else result & candidates
+                if not result:
+                    return []
+            return self._rows_by_ids_locked(result)
+
+    def _ids_by_paths_locked(self, file_paths: Iterable[str]) -> Set[int]:
+        rels = [self.rel_path(p) for p in file_paths]
+        ids: Set[int] = set()
+        for start in range(0, len(rels), 500):
+            chunk = rels[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            ids.update(row[0] for row in self._conn.execute(
+                f"SELECT id FROM reports WHERE rel_path IN ({placeholders})", chunk
+            ))
+        return ids
+
+    def _rows_by_paths(self, file_paths: Iterable[str]) -> List[Dict]:
+        with self._lock:
+            return self._rows_by_ids_locked(self._ids_by_paths_locked(file_paths))
+
+    def _refine_locked(self, report_ids: Set[int], terms: List[str]) -> List[Dict]:
+        """在已知的候选集中逐词校验（检索文本子串或姓名拼音前缀）"""
+        result = report_ids
+        for term in terms:
+            if not result:
+                break
+            matched = self._verify_locked(result, term)
+            if is_pinyin_query(term):
+                matched |= self._match_name_pinyin_locked(term) & result
+            result = matched
+        return self._rows_by_ids_locked(result)
+
+    def _match_name_pinyin_locked(self, term: str) -> Set[int]:
+        """按姓名拼音/首字母前缀匹配"""
+        rows = self._conn.execute(
+            "SELECT DISTINCT report_id FROM name_keys WHERE key >= ? AND key < ?",
+            (term, term + "\uffff")
+        )
+        return {row[0] for row in rows}
+
+    def _verify_locked(self, report_ids: Set[int], term: str) -> Set[int]:
+        """以检索文本做子串校验"""
+        matched: Set[int] = set()
+        ids = list(report_ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT report_id FROM report_text WHERE report_id IN ({placeholders}) "
+                "AND instr(body, ?) > 0",
+                (*chunk, term)
+            )
+            matched.update(row[0] for row in rows)
+        return matched
+
+    def _rows_by_ids_locked(self, report_ids: Set[int]) -> List[Dict]:
+        """按ID取报告行（按文件名时间戳从新到旧）"""
+        rows: List[sqlite3.Row] = []
+        ids = list(report_ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self._conn.execute(
+                f"SELECT * FROM reports WHERE valid=1 AND id IN ({placeholders})", chunk
+            ))
+        rows.sort(key=lambda r: (r["sort_ts"], r["id"]), reverse=True)
+        return [self._row_to_report(row) for row in rows]
+
+    def _filter_sql(self, filters: Optional[Dict]) -> Tuple[str, List]:
+        """将列表过滤条件转换为SQL（只使用索引列）"""
+        clauses = ["valid=1"]
+        params: List = []
+        filters = filters or {}
+        if filters.get("patient_id"):
+            clauses.append("patient_id=?")
+            params.append(str(filters["patient_id"]))
+        if filters.get("date_from"):
+            clauses.append("date_folder >= ?")
+            params.append(str(filters["date_from"]))
+        if filters.get("date_to"):
+            clauses.append("date_folder <= ?")
+            params.append(str(filters["date_to"]))
+        for field, value in (filters.get("fields") or {}).items():
+            clauses.append("id IN (SELECT report_id FROM field_values WHERE field=? AND value=?)")
+            params.extend([field, str(value)])
+        return " AND ".join(clauses), params
+
+    def indexed_fields(self) -> List[str]:
+        """二级索引字段（基本信息中的字段key）"""
+        return json.loads(self.get_meta("indexed_fields") or "[]")
+
+    def indexed_paths(self) -> Dict[str, Set[str]]:
+        """
+        可由索引直接回答的报告路径及其支持的运算符（供查询计划使用）
+
+        Returns:
+            {点分路径: 运算符集合}
+        """
+        basic_info_key = self.get_meta("basic_info_key") or "基本信息"
+        paths = {f"{basic_info_key}.{field}": set(_SQL_OPERATORS) for field in _PATH_COLUMNS}
+        for field in self.indexed_fields():
+            paths[f"{basic_info_key}.{field}"] = set(_FIELD_SQL_OPERATORS)
+        return paths
+
+    def ambiguous_literals(self) -> Dict[str, Set[str]]:
+        """
+        索引无法正确回答的字面量（reports 表列中的占位值，供查询计划改为逐份校验）
+
+        Returns:
+            {点分路径: 字面量集合}
+        """
+        basic_info_key = self.get_meta("basic_info_key") or "基本信息"
+        indexed_fields = set(self.indexed_fields())
+        return {
+            f"{basic_info_key}.{field}": set(_AMBIGUOUS_COLUMN_VALUES)
+            for field in _PATH_COLUMNS if field not in indexed_fields
+        }
+
+    def _conditions_sql(self, conditions: List[Tuple[str, str, str]]) -> Tuple[str, List]:
+        """将索引条件转换为SQL（二级索引字段优先于 reports 表列）"""
+        prefix_len = len((self.get_meta("basic_info_key") or "基本信息") + ".")
+        indexed_fields = set(self.indexed_fields())
+        clauses: List[str] = []
+        params: List = []
+        for path, op, value in conditions:
+            field = path[prefix_len:]
+            if field in indexed_fields:
+                membership = "NOT IN" if op == "!=" else "IN"
+                clauses.append(
+                    f"id {membership} (SELECT report_id FROM field_values "
+                    f"WHERE field=? AND {_FIELD_SQL_OPERATORS[op]})"
+                )
+                params.extend([field, value])
+            else:
+                clauses.append(f"{_PATH_COLUMNS[field]} {_SQL_OPERATORS[op]} ?")
+                params.append(value)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def query_rows(self, conditions: List[Tuple[str, str, str]],
+                   filters: Optional[Dict] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        按索引条件查询报告行（按文件名时间戳从新到旧）
+
+        Args:
+            conditions: (点分路径, 运算符, 值) 列表，路径与运算符须在 indexed_paths() 中
+            filters: 过滤条件，同 list_page（不含 text）
+            limit: 最多返回条数，None 表示不限
+
+        Returns:
+            报告列表
+        """
+        where, params = self._filter_sql(filters)
+        condition_sql, condition_params = self._conditions_sql(conditions)
+        params.extend(condition_params)
+        sql = f"SELECT * FROM reports WHERE {where}{condition_sql} ORDER BY sort_ts DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_report(row) for row in rows]
+
+    def count_rows(self, conditions: List[Tuple[str, str, str]], filters: Optional[Dict] = None) -> int:
+        """
+        统计满足索引条件的报告数量（只读索引）
+
+        Args:
+            conditions: 同 query_rows
+            filters: 同 query_rows
+
+        Returns:
+            报告数量
+        """
+        where, params = self._filter_sql(filters)
+        condition_sql, condition_params = self._conditions_sql(conditions)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM reports WHERE {where}{condition_sql}", params + condition_params
+            ).fetchone()[0]
+
+    def list_page(self, cursor: Optional[str] = None, limit: int = 50,
+                  filters: Optional[Dict] = None) -> Dict:
+        """
+        按文件名时间戳从新到旧分页列出报告（键集分页，代价与页大小成正比）
+
+        Args:
+            cursor: 上一页返回的 next_cursor，首页传None
+            limit: 每页条数
+            filters: 过滤条件，支持 patient_id、date_from/date_to（日期文件夹名 YYYY-MM-DD）、
+                     fields（二级索引字段等值过滤，{字段: 值}）、text（全文搜索关键词）
+
+        Returns:
+            {"rows": 报告列表, "next_cursor": 下一页游标（无更多数据时为None）}
+        """
+        limit = max(1, int(limit))
+        filters = filters or {}
+        if filters.get("text", "").strip():
+            # 全文搜索结果本身是轻量行，按偏移分页
+            rows = self.search(filters["text"])
+            where_rows = self._filter_search_rows(rows, filters)
+            offset = int(cursor) if cursor else 0
+            page = where_rows[offset:offset + limit]
+            next_cursor = str(offset + limit) if offset + limit < len(where_rows) else None
+            return {"rows": page, "next_cursor": next_cursor}
+
+        where, params = self._filter_sql(filters)
+        if cursor:
+            sort_ts, report_id = cursor.split(":", 1)
+            where += " AND (sort_ts < ? OR (sort_ts = ? AND id < ?))"
+            params.extend([float(sort_ts), float(sort_ts), int(report_id)])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM reports WHERE {where} ORDER BY sort_ts DESC, id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last['sort_ts']!r}:{last['id']}"
+        return {"rows": [self._row_to_report(row) for row in rows], "next_cursor": next_cursor}
+
+    def _filter_search_rows(self, rows: List[Dict], filters: Dict) -> List[Dict]:
+        """对搜索结果应用过滤条件"""
+        rows = [r for r in rows if self._row_matches_filters(r, filters)]
+        if filters.get("fields") and rows:
+            where, params = self._filter_sql({"fields": filters["fields"]})
+            with self._lock:
+                allowed = {
+                    self.abs_path(row["rel_path"]) for row in self._conn.execute(
+                        f"SELECT rel_path FROM reports WHERE {where}", params
+                    )
+                }
+            rows = [r for r in rows if r["file_path"] in allowed]
+        return rows
+
+    def _row_matches_filters(self, report: Dict, filters: Dict) -> bool:
+        """对搜索结果应用索引列过滤条件"""
+        if filters.get("patient_id") and report["patient_id"] != str(filters["patient_id"]):
+            return False
+        date_folder = report["date_folder"]
+        if filters.get("date_from") and date_folder < str(filters["date_from"]):
+            return False
+        if filters.get("date_to") and date_folder > str(filters["date_to"]):
+            return False
+        return True
+
+    def count(self, filters: Optional[Dict] = None) -> int:
+        """
+        统计满足过滤条件的报告数量
+
+        Args:
+            filters: 过滤条件，同 list_page
+
+        Returns:
+            报告数量
+        """
+        filters = filters or {}
+        if filters.get("text", "").strip():
+            return len(self._filter_search_rows(self.search(filters["text"]), filters))
+        where, params = self._filter_sql(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM reports WHERE {where}", params).fetchone()[0]
@@ -0,0 +1,152 @@
+"""
+报告键字典模块 - 将报告中的页面/字段名（如 '44℃右侧SPVmax (°/s)'）映射为短整数ID，
+供紧凑存储格式编码键名使用
+
+字典由 pages/*.json 编译，保存在 report_keys.json 中，只追加不修改：
+页面新增字段时分配新ID并递增版本号，已有ID永不变更或复用，
+因此任何版本写入的报告都可以用同一或更新版本的字典解码。
+页面定义修改后执行以下命令更新字典：
+    python report_keys.py
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from report_schema import ReportSchema
+
+
+KEY_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_keys.json")
+
+# 字典中没有的键按原文保存，加此前缀以区别于数字ID
+_LITERAL_PREFIX = "~"
+
+
+class KeyDictionary:
+    """版本化的键字典：{键名: ID}，ID 从1开始递增"""
+
+    def __init__(self, version: int = 0, keys: Optional[Dict[str, int]] = None):
+        self.version = version
+        self.keys: Dict[str, int] = dict(keys or {})
+        self._names: Dict[str, str] = {str(key_id): name for name, key_id in self.keys.items()}
+
+    @classmethod
+    def load(cls, path: str = KEY_DICTIONARY_PATH) -> "KeyDictionary":
+        """
+        加载键字典（文件不存在时返回空字典，此时所有键按原文保存）
+
+        Args:
+            path: 字典文件路径
+
+        Returns:
+            键字典
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        return cls(int(raw.get("version", 0)), raw.get("keys", {}))
+
+    def save(self, path: str = KEY_DICTIONARY_PATH):
+        """保存键字典"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "description": "报告页面/字段名到短ID的映射（只追加），由 pages/*.json 编译，用于紧凑存储格式",
+                "version": self.version,
+                "keys": self.keys,
+            }, f, ensure_ascii=False, indent=2)
+
+    def extended(self, schema: ReportSchema) -> "KeyDictionary":
+        """
+        按页面定义追加新的键，有新增时版本号加1
+
+        Args:
+            schema: 报告结构
+
+        Returns:
+            新的键字典（无新增时返回自身）
+        """
+        names: List[str] = []
+        for page_key, fields in schema.pages.items():
+            names.append(page_key)
+            names.extend(fields)
+        new_names = [n for n in dict.fromkeys(names) if n not in self.keys]
+        if not new_names:
+            return self
+        next_id = max(self.keys.values(), default=0) + 1
+        keys = dict(self.keys)
+        for offset, name in enumerate(new_names):
+            keys[name] = next_id + offset
+        return KeyDictionary(self.version + 1, keys)
+
+    def encode(self, value: Any) -> Any:
+        """
+        递归将字典的键替换为ID（字典中没有的键按原文加前缀保存）
+
+        Args:
+            value: 报告数据（或其中的值）
+
+        Returns:
+            编码后的数据
+        """
+        if isinstance(value, dict):
+            encoded = {}
+            for key, item in value.items():
+                key_id = self.keys.get(key)
+                encoded_key = str(key_id) if key_id is not None else _LITERAL_PREFIX + key
+                encoded[encoded_key] = self.encode(item)
+            return encoded
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        return value
+
+    def decode(self, value: Any) -> Any:
+        """
+        encode 的逆操作
+
+        Args:
+            value: 编码后的数据
+
+        Returns:
+            报告数据
+        """
+        if isinstance(value, dict):
+            decoded = {}
+            for key, item in value.items():
+                if key.startswith(_LITERAL_PREFIX):
+                    name = key[len(_LITERAL_PREFIX):]
+                else:
+                    name = self._names.get(key)
+                    if name is None:
+                        raise ValueError(f"键字典（版本 {self.version}）中没有ID {key}，请更新 report_keys.json")
+                decoded[name] = self.decode(item)
+            return decoded
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        return value
+
+
+_dictionary: Optional[KeyDictionary] = None
+
+
+def get_key_dictionary() -> KeyDictionary:
+    """获取内置键字典（进程内只加载一次）"""
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = KeyDictionary.load()
+    return _dictionary
+
+
+def main():
+    dictionary = KeyDictionary.load()
+    updated = dictionary.extended(ReportSchema.load())
+    if updated is dictionary:
+        print(f"键字典已是最新（版本 {dictionary.version}，共 {len(dictionary.keys)} 个键）")
+        return
+    updated.save()
+    print(f"键字典已更新到版本 {updated.version}：新增 {len(updated.keys) - len(dictionary.keys)} 个键，"
+          f"共 {len(updated.keys)} 个键")
+
+
+if __name__ == "__main__":
+    main()
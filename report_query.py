@@ -0,0 +1,225 @@
+"""
+报告查询模块 - 按点分路径（与模板 data_path 相同，如 '温度试验.检查结果'）对报告内容做结构化查询
+
+条件写法：
+    '温度试验.检查结果 == "异常"'
+    '头脉冲试验.VOR增益 (左外半规管) < 0.8'
+    ('基本信息.检查医生', '==', '赵敏')
+
+比较语义由字面量类型决定：带引号的字符串按文本比较，数字按数值比较（字段无法转换为数字时不命中）；
+空值只匹配 == "" 与 !=；列表字段（多选）任一元素满足即命中。
+
+查询计划把可由索引回答的条件交给 SQL，其余条件在流式读取候选报告时逐份校验。
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+# 支持的比较运算符（'=' 与 '包含' 分别是 '==' 与 'contains' 的别名）
+OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "contains")
+_OPERATOR_ALIASES = {"=": "==", "包含": "contains"}
+
+_CONDITION_RE = re.compile(r"^(?P<path>.+?)\s*(?P<op>==|!=|<=|>=|=|<|>|\scontains\s|\s?包含\s?)\s*(?P<value>.*)$")
+
+
+def get_path_value(data: Any, keys: Iterable[str]) -> Any:
+    """
+    按路径取值（语义同 ExcelGenerator._get_data_value，缺失时返回空字符串）
+
+    Args:
+        data: 报告数据
+        keys: 已拆分的路径
+
+    Returns:
+        字段值
+    """
+    value = data
+    for key in keys:
+        if isinstance(value, dict):
+            value = value.get(key, "")
+        else:
+            return ""
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _compare_scalar(field: Any, op: str, literal: Union[str, float]) -> bool:
+    """比较单个字段值（非列表）"""
+    if op == "contains":
+        return not _is_empty(field) and str(literal) in str(field)
+    if _is_empty(field):
+        return op == "==" and literal == ""
+    if isinstance(literal, float):
+        number = _to_number(field)
+        if number is None:
+            return False
+        left, right = number, literal
+    else:
+        left, right = str(field), literal
+    if op == "==":
+        return left == right
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+class Condition:
+    """单个查询条件：路径 运算符 字面量"""
+
+    def __init__(self, path: str, op: str, value: Any):
+        """
+        Args:
+            path: 点分路径，如 '温度试验.检查结果'
+            op: 运算符，见 OPERATORS
+            value: 字面量，字符串按文本比较，数字按数值比较
+        """
+        op = _OPERATOR_ALIASES.get(op.strip(), op.strip())
+        if op not in OPERATORS:
+            raise ValueError(f"不支持的运算符: {op}（可选: {', '.join(OPERATORS)}）")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        elif value is None:
+            value = ""
+        else:
+            value = str(value)
+        self.path = path.strip()
+        self.keys = self.path.split(".")
+        self.op = op
+        self.value = value
+
+    @property
+    def is_numeric(self) -> bool:
+        return isinstance(self.value, float)
+
+    def matches(self, data: Dict) -> bool:
+        """报告是否满足条件"""
+        field = get_path_value(data, self.keys)
+        if self.op == "==":
+            return self._matches_eq(field)
+        if self.op == "!=":
+            return not self._matches_eq(field)
+        if isinstance(field, list):
+            return any(_compare_scalar(item, self.op, self.value) for item in field)
+        return _compare_scalar(field, self.op, self.value)
+
+    def _matches_eq(self, field: Any) -> bool:
+        if isinstance(field, list):
+            if not field:
+                return self.value == ""
+            return any(_compare_scalar(item, "==", self.value) for item in field)
+        return _compare_scalar(field, "==", self.value)
+
+    def __repr__(self) -> str:
+        value = self.value if self.is_numeric else json.dumps(self.value, ensure_ascii=False)
+        return f"{self.path} {self.op} {value}"
+
+
+def _parse_literal(text: str) -> Union[str, float]:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        if text[0] == '"':
+            try:
+                return json.loads(text)
+            except ValueError:
+                pass
+        return text[1:-1]
+    number = _to_number(text)
+    return number if number is not None else text
+
+
+def parse_condition(expr: str) -> Condition:
+    """
+    解析条件表达式，如 '温度试验.检查结果 == "异常"'
+
+    Args:
+        expr: 条件表达式
+
+    Returns:
+        查询条件
+    """
+    match = _CONDITION_RE.match(expr.strip())
+    if not match or not match.group("path").strip():
+        raise ValueError(f"无法解析查询条件: {expr}")
+    return Condition(match.group("path"), match.group("op"), _parse_literal(match.group("value")))
+
+
+ConditionLike = Union[str, Tuple[str, str, Any], Condition]
+
+
+def as_condition(condition: ConditionLike) -> Condition:
+    """将表达式字符串、(路径, 运算符, 值) 元组统一转换为 Condition"""
+    if isinstance(condition, Condition):
+        return condition
+    if isinstance(condition, str):
+        return parse_condition(condition)
+    path, op, value = condition
+    return Condition(path, op, value)
+
+
+class QueryPlan:
+    """查询计划：indexed 交给索引（SQL）求候选集，residual 在读取报告后逐份校验"""
+
+    def __init__(self, indexed: List[Condition], residual: List[Condition]):
+        self.indexed = indexed
+        self.residual = residual
+
+    @property
+    def index_only(self) -> bool:
+        """是否仅凭索引即可得到结果（无需读取报告内容）"""
+        return not self.residual
+
+    def matches(self, data: Dict) -> bool:
+        """报告是否满足所有剩余条件"""
+        return all(condition.matches(data) for condition in self.residual)
+
+    def explain(self) -> str:
+        """计划的可读描述（排查慢查询用）"""
+        indexed = " AND ".join(map(repr, self.indexed)) or "-"
+        residual = " AND ".join(map(repr, self.residual)) or "-"
+        return f"索引: {indexed}; 扫描校验: {residual}"
+
+
+def plan_query(conditions: List[Condition], indexed_paths: Dict[str, Set[str]],
+               ambiguous_literals: Optional[Dict[str, Set[str]]] = None) -> QueryPlan:
+    """
+    生成查询计划
+
+    Args:
+        conditions: 查询条件
+        indexed_paths: 索引可回答的路径及其支持的运算符
+        ambiguous_literals: 索引中无法与缺失值区分的字面量（如占位值"未知"），按路径给出
+
+    Returns:
+        查询计划
+    """
+    indexed: List[Condition] = []
+    residual: List[Condition] = []
+    ambiguous_literals = ambiguous_literals or {}
+    for condition in conditions:
+        ops = indexed_paths.get(condition.path, set())
+        # 空字面量与占位值涉及"字段缺失"语义，数值比较需要类型转换，都留给逐份校验
+        if (condition.op in ops and not condition.is_numeric and condition.value != ""
+                and condition.value not in ambiguous_literals.get(condition.path, ())):
+            indexed.append(condition)
+        else:
+            residual.append(condition)
+    return QueryPlan(indexed, residual)
@@ -0,0 +1,150 @@
+"""
+报告结构模块 - 由 pages/*.json 页面定义编译出报告的字段结构（页面 -> 字段 -> 空值）
+
+用于紧凑存储格式：保存时去掉与页面定义空值相同的字段，读取时按页面定义补回，
+使只填写了少数页面的报告在磁盘上只保存实际填写的内容。
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+# 非数据页面（没有报告字段）
+_NON_DATA_PAGES = ("index", "database_management")
+
+
+def _empty_value(field_type: str) -> Any:
+    """字段类型对应的空值（与页面 get_data 未填写时的取值一致）"""
+    return [] if field_type == "checkboxes" else ""
+
+
+def _collect_fields(node: Any, fields: Dict[str, Any]):
+    """递归收集页面定义中的字段 key 及其空值"""
+    if isinstance(node, dict):
+        if "key" in node and "type" in node:
+            fields.setdefault(str(node["key"]), _empty_value(node["type"]))
+        for value in node.values():
+            _collect_fields(value, fields)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_fields(item, fields)
+
+
+class ReportSchema:
+    """报告字段结构：{页面key（页面title）: {字段key: 空值}}，保持页面与字段的定义顺序"""
+
+    def __init__(self, pages: Dict[str, Dict[str, Any]]):
+        self.pages = pages
+
+    @classmethod
+    def load(cls, pages_dir: str = PAGES_DIR) -> "ReportSchema":
+        """
+        从页面定义目录编译报告结构（页面顺序同 pages/index.json）
+
+        Args:
+            pages_dir: 页面定义目录
+
+        Returns:
+            报告结构
+        """
+        page_ids: List[str] = []
+        try:
+            with open(os.path.join(pages_dir, "index.json"), "r", encoding="utf-8") as f:
+                page_ids = [p["id"] for p in json.load(f).get("pages", []) if p.get("id")]
+        except Exception:
+            pass
+        try:
+            names = sorted(n[:-5] for n in os.listdir(pages_dir) if n.endswith(".json"))
+        except OSError:
+            names = []
+        page_ids += [n for n in names if n not in page_ids]
+
+        pages: Dict[str, Dict[str, Any]] = {}
+        for page_id in page_ids:
+            if page_id in _NON_DATA_PAGES:
+                continue
+            try:
+                with open(os.path.join(pages_dir, f"{page_id}.json"), "r", encoding="utf-8") as f:
+                    page_config = json.load(f)
+            except Exception:
+                continue
+            fields: Dict[str, Any] = {}
+            _collect_fields(page_config.get("sections", []), fields)
+            if not fields:
+                continue
+            # 与 JsonPageRenderer.get_data 的根key规则一致
+            root_key = page_config.get("title") or page_config.get("name") or page_config.get("page_id", page_id)
+            pages.setdefault(root_key, {}).update(fields)
+        return cls(pages)
+
+    def strip_empty(self, data: Dict) -> Dict:
+        """
+        去掉与页面定义空值相同的字段（全部为空的页面保留为 {}，以区别于报告中没有的页面）；
+        不在页面定义中的字段原样保留。
+        输出按页面定义排序，使 strip_empty(fill_defaults(x)) == x，重复整理时内容稳定
+
+        Args:
+            data: 报告数据
+
+        Returns:
+            稀疏的报告数据（新字典，不修改传入数据）
+        """
+        sparse: Dict = {}
+        for page_key, fields in self.pages.items():
+            page_data = data.get(page_key)
+            if not isinstance(page_data, dict):
+                continue
+            kept = {
+                key: page_data[key] for key, empty in fields.items()
+                if key in page_data and page_data[key] != empty
+            }
+            for key, value in page_data.items():
+                if key not in fields:
+                    kept[key] = value
+            sparse[page_key] = kept
+        for page_key, page_data in data.items():
+            if page_key not in sparse and not (page_key in self.pages and isinstance(page_data, dict)):
+                sparse[page_key] = page_data
+        return sparse
+
+    def fill_defaults(self, sparse: Dict) -> Dict:
+        """
+        按页面定义补回空字段（strip_empty 的逆操作）；只补报告中存在的页面，缺少的页面不会凭空生成
+
+        Args:
+            sparse: 稀疏的报告数据
+
+        Returns:
+            完整的报告数据（新字典）
+        """
+        data: Dict = {}
+        for page_key, fields in self.pages.items():
+            page_data = sparse.get(page_key)
+            if not isinstance(page_data, dict):
+                continue
+            full = {key: page_data.get(key, _copy_empty(empty)) for key, empty in fields.items()}
+            for key, value in page_data.items():
+                if key not in full:
+                    full[key] = value
+            data[page_key] = full
+        for page_key, page_data in sparse.items():
+            if page_key not in data:
+                data[page_key] = page_data
+        return data
+
+
+def _copy_empty(value: Any) -> Any:
+    return [] if isinstance(value, list) else value
+
+
+_schema: Optional[ReportSchema] = None
+
+
+def get_report_schema() -> ReportSchema:
+    """获取当前页面定义的报告结构（进程内只编译一次）"""
+    global _schema
+    if _schema is None:
+        _schema = ReportSchema.load()
+    return _schema
@@ -0,0 +1,1300 @@
+"""
+报告存储后端模块 - 将报告的保存、读取、删除、列表、查询、遍历抽象为统一接口
+- FolderStorage: 默认的 report/<YYYY-MM-DD>/<患者ID>_<时间戳>.json 目录布局
+- SQLiteStorage: 单文件 SQLite 存储（正文为JSON1列），适合报告量大的站点
+- SegmentStorage: 追加写入的分段文件存储（定长上限的段文件 + 偏移索引），文件数少，便于备份与批量读取
+
+两种后端使用相同的报告键（report/<日期>/<文件名> 形式的路径），可互相迁移：
+    python report_storage.py migrate --to sqlite
+
+报告正文的序列化格式（标准/紧凑/冷数据压缩）见 report_codec.py；按当前配置整理已有报告：
+    python report_storage.py compact
+
+目录布局下将早于 database.archive.archive_after_days 天的日期文件夹按月归档为zip（读取透明）：
+    python report_storage.py archive
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from report_codec import ReportCodec
+from report_index import INDEX_FILENAME, ReportIndex, parse_filename_timestamp
+
+
+SQLITE_STORE_FILENAME = "reports.sqlite3"
+ARCHIVE_FOLDER = "archive"
+SEGMENT_FOLDER = "segments"
+SEGMENT_INDEX_FILENAME = "segment_index.db"
+
+# 由报告数据提取索引元数据的函数（patient_id, name, exam_time, text）
+MetadataExtractor = Callable[[Dict], Dict[str, str]]
+
+
+def fsync_file(path: str):
+    """将文件内容刷到磁盘"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(path: str):
+    """将目录项（新建、改名）刷到磁盘；Windows 不支持打开目录，跳过"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, content: bytes, fsync: bool = True):
+    """
+    原子写入文件：先写同目录下的临时文件，再用 os.replace 替换目标，
+    中途崩溃或断电时目标要么是旧内容、要么是完整的新内容，不会出现写了一半的文件
+
+    Args:
+        path: 目标文件路径
+        content: 文件内容
+        fsync: 是否在替换前后刷盘（批量写入时可关闭，由调用方在批次结束时统一刷盘）
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_dir(os.path.dirname(path) or ".")
+
+
+class StorageBackend(ABC):
+    """报告存储后端接口"""
+
+    name = ""
+    # 批量写入时每累计这么多项提交一次索引事务（期间释放索引锁，界面的加载/搜索线程可以穿插执行）
+    BATCH_COMMIT_SIZE = 50
+
+    def __init__(self, db_path: str, options: Optional[Dict] = None):
+        """
+        初始化存储后端
+
+        Args:
+            db_path: 数据库路径
+            options: 数据库配置（config["database"]），其中 compact_format 决定报告序列化格式，
+                     fsync_writes 决定每次保存后是否刷盘（默认是）
+        """
+        self.db_path = db_path
+        self.report_folder = os.path.join(db_path, "report")
+        self.options = options or {}
+        self.codec = ReportCodec(self.options.get("compact_format"))
+        self.fsync = bool(self.options.get("fsync_writes", True))
+        # 批量写入（batch）期间延后刷盘的文件与目录
+        self._batch_depth = 0
+        self._batch_tx = None
+        self._batch_thread: Optional[int] = None
+        self._batch_items = 0
+        self._pending_sync: Dict[str, None] = {}
+        self._pending_sync_lock = threading.Lock()
+        self.index: ReportIndex = self._open_index()
+
+    @abstractmethod
+    def _open_index(self) -> ReportIndex:
+        """打开（或创建）该后端使用的报告索引"""
+
+    @contextmanager
+    def batch(self):
+        """
+        批量写入（可嵌套）：文件不逐个刷盘，最外层退出时统一刷盘一次（组提交）；
+        索引按 BATCH_COMMIT_SIZE 项分段提交（见 batch_checkpoint），不会在整个批次期间占用索引锁。
+        批量导入、迁移、整理时使用，以免每份报告都付出一次完整的 fsync；批次中途崩溃不会产生残缺文件，
+        索引中已提交但文件尚未刷盘的报告由下次对账修正。
+        """
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+        self._batch_depth = 1
+        self._batch_thread = threading.get_ident()
+        self._batch_items = 0
+        self._batch_tx = self.index.transaction()
+        self._batch_tx.__enter__()
+        try:
+            yield self
+        except BaseException as e:
+            tx, self._batch_tx = self._batch_tx, None
+            if not tx.__exit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            tx, self._batch_tx = self._batch_tx, None
+            tx.__exit__(None, None, None)
+        finally:
+            self._batch_tx = None
+            self._batch_thread = None
+            self._batch_depth = 0
+            self._flush_pending_sync()
+
+    def batch_checkpoint(self):
+        """
+        批次内每完成一项后调用：累计 BATCH_COMMIT_SIZE 项时提交索引事务并释放索引锁，再开启下一段。
+        不在批次中、不是批次所在线程或仍处于嵌套的索引事务中时不做任何事。
+        """
+        if self._batch_tx is None or self._batch_thread != threading.get_ident():
+            return
+        if self.index.transaction_depth != 1:
+            return
+        self._batch_items += 1
+        if self._batch_items < self.BATCH_COMMIT_SIZE:
+            return
+        self._batch_items = 0
+        tx, self._batch_tx = self._batch_tx, None
+        tx.__exit__(None, None, None)
+        self._batch_tx = self.index.transaction()
+        self._batch_tx.__enter__()
+
+    @property
+    def in_batch(self) -> bool:
+        return self._batch_depth > 0
+
+    def _defer_sync(self, *paths: str):
+        """登记批次结束时需要刷盘的文件/目录"""
+        with self._pending_sync_lock:
+            for path in paths:
+                self._pending_sync[path] = None
+
+    def _flush_pending_sync(self):
+        """只刷本批次登记的文件，再对涉及的目录各刷一次（不用 os.sync，以免刷出整个系统的脏页）"""
+        with self._pending_sync_lock:
+            paths, self._pending_sync = list(self._pending_sync), {}
+        if not paths or not self.fsync:
+            return
+        dirs: Dict[str, None] = {}
+        for path in paths:
+            if os.path.isdir(path):
+                dirs[path] = None
+                continue
+            dirs[os.path.dirname(path) or "."] = None
+            try:
+                fsync_file(path)
+            except FileNotFoundError:
+                # 批次内又被删除或移走（如归档）
+                pass
+            except OSError as e:
+                print(f"刷盘失败 {path}: {e}")
+        for path in dirs:
+            try:
+                fsync_dir(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"刷盘失败 {path}: {e}")
+
+    def _write_file(self, path: str, content: bytes):
+        """原子写入报告文件（批次内延后刷盘）"""
+        if self.in_batch:
+            atomic_write(path, content, fsync=False)
+            self._defer_sync(path, os.path.dirname(path))
+        else:
+            atomic_write(path, content, fsync=self.fsync)
+
+    def new_key(self, date_folder: str, filename: str) -> str:
+        """
+        为新报告生成报告键
+
+        Args:
+            date_folder: 日期文件夹名（YYYY-MM-DD）
+            filename: 文件名（患者ID_时间戳.json）
+
+        Returns:
+            报告键（文件路径形式）
+        """
+        return os.path.join(self.report_folder, date_folder, filename)
+
+    @abstractmethod
+    def write(self, key: str, data: Dict, metadata: Dict[str, str]):
+        """保存报告并同步更新索引"""
+
+    @abstractmethod
+    def read(self, key: str) -> Optional[Dict]:
+        """读取报告，失败返回None"""
+
+    @abstractmethod
+    def fingerprint(self, key: str) -> Optional[Tuple[int, int]]:
+        """报告的 (修改时间ns, 大小) 指纹，用于缓存校验；不存在返回None"""
+
+    def exists(self, key: str) -> bool:
+        """报告是否存在"""
+        return self.fingerprint(key) is not None
+
+    @abstractmethod
+    def remove(self, key: str):
+        """删除报告并同步更新索引（不存在时抛出 FileNotFoundError）"""
+
+    @abstractmethod
+    def iterate(self, since: Optional[str] = None,
+                until: Optional[str] = None) -> Iterator[Tuple[str, str, Dict]]:
+        """
+        按日期分区从旧到新流式遍历报告
+
+        Args:
+            since: 起始日期文件夹名（含）
+            until: 结束日期文件夹名（含）
+
+        Yields:
+            (报告键, 日期文件夹名, 报告数据)
+        """
+
+    @abstractmethod
+    def rebuild_index(self, extract: MetadataExtractor):
+        """全量重建索引"""
+
+    def sync_index(self, extract: MetadataExtractor, full: bool = False) -> int:
+        """与存储对账索引，返回变化的报告数（默认无外部变更来源）"""
+        return 0
+
+    def recompact(self, extract: MetadataExtractor,
+                  progress: Optional[Callable[[int, str], None]] = None) -> int:
+        """
+        按当前序列化配置重写已有报告（如启用紧凑格式后整理旧报告、压缩冷数据）
+
+        Args:
+            extract: 元数据提取函数
+            progress: 进度回调，参数为 (已重写数量, 报告键)
+
+        Returns:
+            重写的报告数量
+        """
+        count = 0
+        with self.batch():
+            for key, date_folder, data in self.iterate():
+                if self._rewrite_if_changed(key, date_folder, data, extract):
+                    count += 1
+                    if progress:
+                        progress(count, key)
+                self.batch_checkpoint()
+        return count
+
+    @abstractmethod
+    def _rewrite_if_changed(self, key: str, date_folder: str, data: Dict,
+                            extract: MetadataExtractor) -> bool:
+        """序列化结果与现有内容不同时重写报告，返回是否重写"""
+
+    def close(self):
+        """关闭后端"""
+        self.index.close()
+
+
+class FolderStorage(StorageBackend):
+    """
+    目录布局存储：report/<YYYY-MM-DD>/<患者ID>_<时间戳>.json，索引为旁路 SQLite 文件
+
+    早于 archive.archive_after_days 天的日期文件夹可归档为 archive/<YYYY-MM>.zip（每月一个），
+    归档目录（archive_entries 表，与索引同库）记录每份报告所在的压缩包；
+    读取时先找文件、再找归档，对上层透明。编辑已归档的报告会重新写出为文件（文件优先）。
+    """
+
+    name = "folder"
+
+    _ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive_entries (
+        rel_path    TEXT PRIMARY KEY,
+        archive     TEXT NOT NULL,
+        size        INTEGER NOT NULL,
+        archived_ns INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_archive_entries_archive ON archive_entries (archive);
+    """
+
+    def _open_index(self) -> ReportIndex:
+        os.makedirs(self.db_path, exist_ok=True)
+        self.archive_folder = os.path.join(self.db_path, ARCHIVE_FOLDER)
+        # 已打开的归档：月份 -> (压缩包mtime_ns, ZipFile)
+        self._zip_cache: Dict[str, Tuple[int, zipfile.ZipFile]] = {}
+        self._zip_lock = threading.Lock()
+        index = ReportIndex(self.report_folder, os.path.join(self.db_path, INDEX_FILENAME))
+        with index.transaction() as conn:
+            conn.executescript(self._ARCHIVE_SCHEMA)
+            if conn.execute("SELECT 1 FROM archive_entries LIMIT 1").fetchone() is None:
+                self._recover_archive_entries(conn)
+        return index
+
+    def _recover_archive_entries(self, conn):
+        """
+        索引文件丢失时按压缩包内容恢复归档目录
+
+        压缩包中可能残留已删除报告的旧内容（在该月下次归档时才清除），恢复后这些报告会重新出现，
+        这是索引丢失时能做到的最好结果。
+        """
+        if not os.path.isdir(self.archive_folder):
+            return
+        for name in sorted(os.listdir(self.archive_folder)):
+            if not name.endswith(".zip"):
+                continue
+            path = os.path.join(self.archive_folder, name)
+            try:
+                with zipfile.ZipFile(path, "r") as zf:
+                    infos = zf.infolist()
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"读取归档失败 {path}: {e}")
+                continue
+            archived_ns = os.stat(path).st_mtime_ns
+            conn.executemany(
+                "INSERT OR IGNORE INTO archive_entries (rel_path, archive, size, archived_ns) VALUES (?, ?, ?, ?)",
+                ((info.filename, name[:-4], info.file_size, archived_ns) for info in infos)
+            )
+
+    def new_key(self, date_folder: str, filename: str) -> str:
+        folder = os.path.join(self.report_folder, date_folder)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, filename)
+
+    def _archive_entry(self, rel: str) -> Optional[Dict]:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT archive, size, archived_ns FROM archive_entries WHERE rel_path=?", (rel,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _is_archived(self, rel: str) -> bool:
+        return self._archive_entry(rel) is not None
+
+    def _archive_path(self, archive: str) -> str:
+        return os.path.join(self.archive_folder, f"{archive}.zip")
+
+    def _read_archived(self, archive: str, rel: str) -> bytes:
+        """从归档中读取报告内容（压缩包按 mtime 缓存，避免每次解析中央目录）"""
+        path = self._archive_path(archive)
+        with self._zip_lock:
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = self._zip_cache.get(archive)
+            if cached is None or cached[0] != mtime_ns:
+                if cached is not None:
+                    cached[1].close()
+                cached = (mtime_ns, zipfile.ZipFile(path, "r"))
+                self._zip_cache[archive] = cached
+            return cached[1].read(rel)
+
+    def _close_archive(self, archive: str):
+        with self._zip_lock:
+            cached = self._zip_cache.pop(archive, None)
+            if cached is not None:
+                cached[1].close()
+
+    def write(self, key: str, data: Dict, metadata: Dict[str, str]):
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        self._write_file(key, self.codec.encode_file(data, os.path.basename(os.path.dirname(key))))
+        try:
+            with self.index.transaction() as conn:
+                # 文件优先于归档；归档中的旧内容在该月下次归档时清除
+                conn.execute("DELETE FROM archive_entries WHERE rel_path=?", (self.index.rel_path(key),))
+                self.index.upsert(key, metadata)
+        except Exception as e:
+            # 索引失败不影响保存结果，下次对账时会按文件指纹补上
+            print(f"更新报告索引失败 {key}: {e}")
+
+    def read(self, key: str) -> Optional[Dict]:
+        try:
+            try:
+                with open(key, 'rb') as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                rel = self.index.rel_path(key)
+                entry = self._archive_entry(rel)
+                if entry is None:
+                    raise
+                raw = self._read_archived(entry["archive"], rel)
+            return self.codec.decode_bytes(raw)
+        except Exception as e:
+            print(f"加载报告失败 {key}: {e}")
+            return None
+
+    def fingerprint(self, key: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(key)
+        except OSError:
+            entry = self._archive_entry(self.index.rel_path(key))
+            return (entry["archived_ns"], entry["size"]) if entry else None
+        return st.st_mtime_ns, st.st_size
+
+    def remove(self, key: str):
+        rel = self.index.rel_path(key)
+        try:
+            os.remove(key)
+            removed = True
+        except FileNotFoundError:
+            removed = False
+        with self.index.transaction() as conn:
+            archived = conn.execute("DELETE FROM archive_entries WHERE rel_path=?", (rel,)).rowcount
+            if not removed and not archived:
+                raise FileNotFoundError(key)
+            self.index.remove(key)
+
+    def _rewrite_if_changed(self, key: str, date_folder: str, data: Dict,
+                            extract: MetadataExtractor) -> bool:
+        encoded = self.codec.encode_file(data, date_folder)
+        try:
+            with open(key, 'rb') as f:
+                if f.read() == encoded:
+                    return False
+        except OSError:
+            # 已归档的报告不重写
+            return False
+        self.write(key, data, extract(data))
+        return True
+
+    def _read_metadata_func(self, extract: MetadataExtractor) -> Callable[[str], Optional[Dict[str, str]]]:
+        def read_metadata(key: str) -> Optional[Dict[str, str]]:
+            data = self.read(key)
+            return extract(data) if data else None
+        return read_metadata
+
+    def rebuild_index(self, extract: MetadataExtractor):
+        read_metadata = self._read_metadata_func(extract)
+        with self.index.transaction() as conn:
+            self.index.rebuild(read_metadata)
+            for row in conn.execute("SELECT rel_path, size, archived_ns FROM archive_entries").fetchall():
+                key = self.index.abs_path(row["rel_path"])
+                if not os.path.exists(key):
+                    self.index.upsert(key, read_metadata(key), (row["archived_ns"], row["size"], 0))
+
+    def sync_index(self, extract: MetadataExtractor, full: bool = False) -> int:
+        return self.index.reconcile(self._read_metadata_func(extract), full=full,
+                                    is_archived=self._is_archived)
+
+    def iterate(self, since: Optional[str] = None,
+                until: Optional[str] = None) -> Iterator[Tuple[str, str, Dict]]:
+        loose_folders = []
+        if os.path.isdir(self.report_folder):
+            with os.scandir(self.report_folder) as it:
+                loose_folders = [e.name for e in it if e.is_dir()]
+        with self.index.transaction() as conn:
+            archived_rels = [row["rel_path"] for row in conn.execute("SELECT rel_path FROM archive_entries")]
+        archived_by_folder: Dict[str, List[str]] = {}
+        for rel in archived_rels:
+            date_folder, name = rel.split("/", 1)
+            archived_by_folder.setdefault(date_folder, []).append(name)
+
+        for date_folder in sorted(set(loose_folders) | set(archived_by_folder)):
+            if since and date_folder < since:
+                continue
+            if until and date_folder > until:
+                break
+            date_path = os.path.join(self.report_folder, date_folder)
+            names = set(archived_by_folder.get(date_folder, []))
+            if date_folder in loose_folders:
+                try:
+                    with os.scandir(date_path) as it:
+                        names.update(e.name for e in it if e.name.endswith(".json") and e.is_file())
+                except OSError:
+                    pass
+            for name in sorted(names, key=lambda n: (parse_filename_timestamp(n) or 0.0, n)):
+                key = os.path.join(date_path, name)
+                data = self.read(key)
+                if data is not None:
+                    yield key, date_folder, data
+
+    def archive(self, older_than_days: int,
+                progress: Optional[Callable[[int, str], None]] = None) -> int:
+        """
+        将早于指定天数的日期文件夹按月打包为 archive/<YYYY-MM>.zip，并删除原文件夹
+
+        同月已有归档时合并（丢弃其中已被删除或已重新写出为文件的旧内容）；
+        压缩包先写临时文件再替换，归档目录提交后才删除原文件，中途中断不会丢失报告。
+
+        Args:
+            older_than_days: 天数，日期文件夹早于 今天-天数 的会被归档
+            progress: 进度回调，参数为 (已归档报告数, 压缩包路径)
+
+        Returns:
+            归档的报告数量
+        """
+        if not os.path.isdir(self.report_folder):
+            return 0
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d")
+        with os.scandir(self.report_folder) as it:
+            cold_folders = sorted(e.name for e in it if e.is_dir() and e.name < cutoff)
+        by_month: Dict[str, List[str]] = {}
+        for date_folder in cold_folders:
+            by_month.setdefault(date_folder[:7], []).append(date_folder)
+
+        os.makedirs(self.archive_folder, exist_ok=True)
+        count = 0
+        for month, date_folders in by_month.items():
+            count += self._archive_month(month, date_folders)
+            if progress:
+                progress(count, self._archive_path(month))
+        return count
+
+    def _archive_month(self, month: str, date_folders: List[str]) -> int:
+        path = self._archive_path(month)
+        loose: Dict[str, str] = {}
+        for date_folder in date_folders:
+            date_path = os.path.join(self.report_folder, date_folder)
+            with os.scandir(date_path) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        loose[f"{date_folder}/{entry.name}"] = entry.path
+
+        with self.index.transaction() as conn:
+            live = {
+                row["rel_path"] for row in conn.execute(
+                    "SELECT rel_path FROM archive_entries WHERE archive=?", (month,)
+                )
+            }
+        tmp_path = path + ".tmp"
+        sizes: Dict[str, int] = {}
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as out:
+            if os.path.exists(path):
+                with zipfile.ZipFile(path, "r") as old:
+                    for info in old.infolist():
+                        if info.filename in live and info.filename not in loose:
+                            out.writestr(info, old.read(info))
+                            sizes[info.filename] = info.file_size
+            for rel, file_path in sorted(loose.items()):
+                out.write(file_path, rel)
+                sizes[rel] = os.path.getsize(file_path)
+        if self.fsync:
+            # 原文件在归档目录提交后即删除，压缩包必须先落盘
+            fsync_file(tmp_path)
+        self._close_archive(month)
+        os.replace(tmp_path, path)
+        if self.fsync:
+            fsync_dir(self.archive_folder)
+
+        archived_ns = time.time_ns()
+        with self.index.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO archive_entries (rel_path, archive, size, archived_ns) VALUES (?, ?, ?, ?)",
+                ((rel, month, sizes[rel], archived_ns) for rel in loose)
+            )
+            for date_folder in date_folders:
+                self.index.forget_folder(date_folder)
+
+        for rel, file_path in loose.items():
+            os.remove(file_path)
+        for date_folder in date_folders:
+            try:
+                os.rmdir(os.path.join(self.report_folder, date_folder))
+            except OSError:
+                # 归档期间有新文件写入，保留文件夹，下次归档时处理
+                pass
+        return len(loose)
+
+    def close(self):
+        for archive in list(self._zip_cache):
+            self._close_archive(archive)
+        super().close()
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    单文件 SQLite 存储：报告正文保存在 report_bodies 表（JSON1 校验的文本列），
+    元数据索引（ID、姓名、检查时间等）与正文位于同一文件、同一事务中更新
+    """
+
+    name = "sqlite"
+
+    _BODY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS report_bodies (
+        rel_path   TEXT PRIMARY KEY,
+        body       TEXT NOT NULL CHECK (json_valid(body)),
+        updated_ns INTEGER NOT NULL
+    );
+    """
+
+    # 分批流式读取的批大小
+    _ITER_BATCH = 200
+
+    def _open_index(self) -> ReportIndex:
+        os.makedirs(self.db_path, exist_ok=True)
+        index = ReportIndex(self.report_folder, os.path.join(self.db_path, SQLITE_STORE_FILENAME))
+        with index.transaction() as conn:
+            conn.executescript(self._BODY_SCHEMA)
+        return index
+
+    def _encode_body(self, data: Dict) -> str:
+        # 正文列需是合法JSON（JSON1 校验），故只采用紧凑格式的去空字段，不做压缩
+        return self.codec.encode(data) if self.codec.compact else json.dumps(data, ensure_ascii=False)
+
+    def write(self, key: str, data: Dict, metadata: Dict[str, str]):
+        body = self._encode_body(data)
+        updated_ns = time.time_ns()
+        with self.index.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO report_bodies (rel_path, body, updated_ns) VALUES (?, ?, ?)",
+                (self.index.rel_path(key), body, updated_ns)
+            )
+            self.index.upsert(key, metadata, (updated_ns, len(body), 0))
+
+    def read(self, key: str) -> Optional[Dict]:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT body FROM report_bodies WHERE rel_path=?", (self.index.rel_path(key),)
+            ).fetchone()
+        if row is None:
+            print(f"加载报告失败 {key}: 报告不存在")
+            return None
+        try:
+            return self.codec.decode(row["body"])
+        except Exception as e:
+            print(f"加载报告失败 {key}: {e}")
+            return None
+
+    def fingerprint(self, key: str) -> Optional[Tuple[int, int]]:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT updated_ns, length(body) AS size FROM report_bodies WHERE rel_path=?",
+                (self.index.rel_path(key),)
+            ).fetchone()
+        return (row["updated_ns"], row["size"]) if row else None
+
+    def _rewrite_if_changed(self, key: str, date_folder: str, data: Dict,
+                            extract: MetadataExtractor) -> bool:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT body FROM report_bodies WHERE rel_path=?", (self.index.rel_path(key),)
+            ).fetchone()
+        if row is None or row["body"] == self._encode_body(data):
+            return False
+        self.write(key, data, extract(data))
+        return True
+
+    def remove(self, key: str):
+        rel = self.index.rel_path(key)
+        with self.index.transaction() as conn:
+            cur = conn.execute("DELETE FROM report_bodies WHERE rel_path=?", (rel,))
+            if cur.rowcount == 0:
+                raise FileNotFoundError(key)
+            self.index.remove(key)
+
+    def rebuild_index(self, extract: MetadataExtractor):
+        with self.index.transaction() as conn:
+            self.index.clear()
+            for row in conn.execute("SELECT rel_path, body, updated_ns FROM report_bodies").fetchall():
+                key = self.index.abs_path(row["rel_path"])
+                try:
+                    metadata = extract(self.codec.decode(row["body"]))
+                except Exception as e:
+                    print(f"加载报告失败 {key}: {e}")
+                    metadata = None
+                self.index.upsert(key, metadata, (row["updated_ns"], len(row["body"]), 0))
+            self.index.mark_built()
+
+    def iterate(self, since: Optional[str] = None,
+                until: Optional[str] = None) -> Iterator[Tuple[str, str, Dict]]:
+        # 按 (日期文件夹, 时间戳, 路径) 键集分批读取，不长时间占用连接
+        last: Tuple = ("", -1.0, "")
+        while True:
+            clauses = ["(r.date_folder, r.sort_ts, r.rel_path) > (?, ?, ?)"]
+            params: List = list(last)
+            if since:
+                clauses.append("r.date_folder >= ?")
+                params.append(since)
+            if until:
+                clauses.append("r.date_folder <= ?")
+                params.append(until)
+            with self.index.transaction() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT r.rel_path, r.date_folder, r.sort_ts, b.body
+                    FROM reports r JOIN report_bodies b ON b.rel_path = r.rel_path
+                    WHERE {' AND '.join(clauses)}
+                    ORDER BY r.date_folder, r.sort_ts, r.rel_path
+                    LIMIT ?
+                    """,
+                    (*params, self._ITER_BATCH)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                try:
+                    data = self.codec.decode(row["body"])
+                except Exception as e:
+                    print(f"加载报告失败 {row['rel_path']}: {e}")
+                    continue
+                yield self.index.abs_path(row["rel_path"]), row["date_folder"], data
+            last = (rows[-1]["date_folder"], rows[-1]["sort_ts"], rows[-1]["rel_path"])
+
+
+class SegmentStorage(StorageBackend):
+    """
+    分段追加存储：报告依次追加到 segments/seg-<编号>.dat 段文件（单个段达到上限后换新段），
+    segment_offsets 表记录每份报告最新记录的 (段号, 偏移, 长度)，随机读取只需一次定位读。
+    删除追加墓碑记录；失效记录占比超过阈值的旧段在后台线程中整理（存活记录复制到当前段后删除旧段）。
+
+    记录格式：头部(魔数, 操作, 键长, 正文长, CRC32) + 报告键(UTF-8) + 正文(与目录存储的文件内容相同)
+    """
+
+    name = "segment"
+
+    _RECORD_HEADER = struct.Struct("<4sBHII")
+    _RECORD_MAGIC = b"RSG1"
+    _OP_PUT = 1
+    _OP_DELETE = 2
+
+    _SEGMENT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS segment_offsets (
+        rel_path   TEXT PRIMARY KEY,
+        segment    INTEGER NOT NULL,
+        offset     INTEGER NOT NULL,
+        length     INTEGER NOT NULL,
+        updated_ns INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_segment_offsets_segment ON segment_offsets (segment);
+    CREATE TABLE IF NOT EXISTS segment_files (
+        segment    INTEGER PRIMARY KEY,
+        size       INTEGER NOT NULL,
+        dead_bytes INTEGER NOT NULL DEFAULT 0
+    );
+    """
+
+    # 默认段大小上限与触发整理的失效占比
+    DEFAULT_SEGMENT_SIZE_MB = 16
+    DEFAULT_COMPACT_RATIO = 0.5
+
+    _ITER_BATCH = 200
+
+    def _open_index(self) -> ReportIndex:
+        segment_options = self.options.get("segment_store", {})
+        self.segment_folder = os.path.join(self.db_path, SEGMENT_FOLDER)
+        self.segment_size = int(float(segment_options.get("segment_size_mb", self.DEFAULT_SEGMENT_SIZE_MB))
+                                * 1024 * 1024)
+        self.compact_ratio = float(segment_options.get("compact_garbage_ratio", self.DEFAULT_COMPACT_RATIO))
+        # 段文件的追加、读取与整理互斥（整理会移动记录并删除旧段）；
+        # 锁顺序固定为 先索引事务（索引锁）后 _segment_lock，批次持有的索引事务也遵守这一顺序
+        self._segment_lock = threading.RLock()
+        self._compact_thread: Optional[threading.Thread] = None
+        # 恢复时重放过、需要重新提取元数据的报告
+        self._pending_reindex: List[str] = []
+        os.makedirs(self.segment_folder, exist_ok=True)
+        index = ReportIndex(self.report_folder, os.path.join(self.segment_folder, SEGMENT_INDEX_FILENAME))
+        with index.transaction() as conn:
+            conn.executescript(self._SEGMENT_SCHEMA)
+        self.index = index
+        self._recover()
+        return index
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.segment_folder, f"seg-{segment:06d}.dat")
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.segment_folder):
+            if name.startswith("seg-") and name.endswith(".dat"):
+                try:
+                    numbers.append(int(name[4:-4]))
+                except ValueError:
+                    continue
+        return sorted(numbers)
+
+    def _iter_records(self, segment: int, start: int = 0) -> Iterator[Tuple[int, int, int, str, bytes]]:
+        """
+        顺序读取段文件中的记录（遇到不完整或校验失败的记录即停止）
+
+        Yields:
+            (偏移, 记录长度, 操作, 相对路径, 正文)
+        """
+        header_size = self._RECORD_HEADER.size
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    return
+                magic, op, key_len, body_len, crc = self._RECORD_HEADER.unpack(header)
+                payload = f.read(key_len + body_len)
+                if magic != self._RECORD_MAGIC or len(payload) < key_len + body_len \
+                        or zlib.crc32(payload) != crc:
+                    return
+                length = header_size + key_len + body_len
+                yield offset, length, op, payload[:key_len].decode("utf-8"), payload[key_len:]
+                offset += length
+
+    def _recover(self):
+        """
+        打开时核对段文件与偏移索引：
+        - 偏移索引丢失（无段记录但有段文件）时按顺序扫描全部段重建
+        - 段文件比记录的长度长（写入后未及提交），重放尾部记录；尾部残缺记录截断
+        - 不在段表中的段文件是整理中断留下的旧段，删除
+        """
+        numbers = self._segment_numbers()
+        with self.index.transaction() as conn, self._segment_lock:
+            known = {row["segment"]: row["size"] for row in conn.execute("SELECT segment, size FROM segment_files")}
+            if not known and numbers:
+                conn.execute("DELETE FROM segment_offsets")
+                scan = {number: 0 for number in numbers}
+                self.index.set_meta("built", "0")
+            else:
+                for number in numbers:
+                    if number not in known:
+                        os.remove(self._segment_path(number))
+                scan = {n: size for n, size in known.items() if n in numbers}
+                for number in set(known) - set(numbers):
+                    conn.execute("DELETE FROM segment_offsets WHERE segment=?", (number,))
+                    conn.execute("DELETE FROM segment_files WHERE segment=?", (number,))
+            for number in sorted(scan):
+                path = self._segment_path(number)
+                start = scan[number]
+                if os.path.getsize(path) == start and number in known:
+                    continue
+                end = start
+                # 段记录须先于重放存在，重放中的覆盖与墓碑才能计入其失效字节
+                conn.execute("INSERT OR IGNORE INTO segment_files (segment, size) VALUES (?, 0)", (number,))
+                for offset, length, op, rel, _body in self._iter_records(number, start):
+                    self._apply_record_locked(conn, number, offset, length, op, rel, time.time_ns())
+                    end = offset + length
+                    self._pending_reindex.append(rel)
+                if os.path.getsize(path) > end:
+                    with open(path, "r+b") as f:
+                        f.truncate(end)
+                conn.execute(
+                    "INSERT INTO segment_files (segment, size) VALUES (?, ?) "
+                    "ON CONFLICT(segment) DO UPDATE SET size=excluded.size",
+                    (number, end)
+                )
+        numbers = self._segment_numbers()
+        self._active_segment = numbers[-1] if numbers else 1
+
+    def _apply_record_locked(self, conn, segment: int, offset: int, length: int, op: int, rel: str,
+                             updated_ns: int):
+        """在偏移索引中登记一条记录（旧位置计入失效字节）"""
+        old = conn.execute("SELECT segment, length FROM segment_offsets WHERE rel_path=?", (rel,)).fetchone()
+        if old is not None:
+            conn.execute("UPDATE segment_files SET dead_bytes = dead_bytes + ? WHERE segment=?",
+                         (old["length"], old["segment"]))
+        if op == self._OP_PUT:
+            conn.execute(
+                "INSERT OR REPLACE INTO segment_offsets (rel_path, segment, offset, length, updated_ns) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (rel, segment, offset, length, updated_ns)
+            )
+        else:
+            conn.execute("DELETE FROM segment_offsets WHERE rel_path=?", (rel,))
+            # 墓碑本身不含数据，计为失效字节
+            conn.execute("UPDATE segment_files SET dead_bytes = dead_bytes + ? WHERE segment=?",
+                         (length, segment))
+
+    def _append_locked(self, conn, op: int, rel: str, body: bytes, sync: bool = True) -> Tuple[int, int, int]:
+        """
+        追加一条记录到当前段（超过上限时换新段）
+
+        Args:
+            conn: 索引连接（调用方已持有索引事务与段锁）
+            op: 记录类型
+            rel: 报告相对路径
+            body: 报告内容
+            sync: 是否按配置刷盘（批次内延后到批次结束）；为 False 时由调用方负责刷盘
+
+        Returns:
+            (段号, 偏移, 记录长度)
+        """
+        key = rel.encode("utf-8")
+        payload = key + body
+        record = self._RECORD_HEADER.pack(self._RECORD_MAGIC, op, len(key), len(body), zlib.crc32(payload)) + payload
+        path = self._segment_path(self._active_segment)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and size + len(record) > self.segment_size:
+            self._active_segment += 1
+            path = self._segment_path(self._active_segment)
+            size = 0
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(record)
+            if sync and self.fsync and not self.in_batch:
+                f.flush()
+                os.fsync(f.fileno())
+        if sync and self.in_batch:
+            self._defer_sync(path)
+        conn.execute(
+            "INSERT INTO segment_files (segment, size) VALUES (?, ?) "
+            "ON CONFLICT(segment) DO UPDATE SET size=excluded.size",
+            (self._active_segment, offset + len(record))
+        )
+        return self._active_segment, offset, len(record)
+
+    def _read_body_locked(self, rel: str) -> Optional[bytes]:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT segment, offset, length FROM segment_offsets WHERE rel_path=?", (rel,)
+            ).fetchone()
+        if row is None:
+            return None
+        with open(self._segment_path(row["segment"]), "rb") as f:
+            f.seek(row["offset"])
+            record = f.read(row["length"])
+        _magic, _op, key_len, _body_len, crc = self._RECORD_HEADER.unpack_from(record)
+        payload = record[self._RECORD_HEADER.size:]
+        if zlib.crc32(payload) != crc:
+            raise ValueError("段记录校验失败")
+        return payload[key_len:]
+
+    def write(self, key: str, data: Dict, metadata: Dict[str, str]):
+        rel = self.index.rel_path(key)
+        body = self.codec.encode_file(data, rel.split("/", 1)[0])
+        updated_ns = time.time_ns()
+        with self.index.transaction() as conn, self._segment_lock:
+            segment, offset, length = self._append_locked(conn, self._OP_PUT, rel, body)
+            self._apply_record_locked(conn, segment, offset, length, self._OP_PUT, rel, updated_ns)
+            self.index.upsert(key, metadata, (updated_ns, length, 0))
+        self._schedule_compaction()
+
+    def read(self, key: str) -> Optional[Dict]:
+        try:
+            with self.index.transaction(), self._segment_lock:
+                body = self._read_body_locked(self.index.rel_path(key))
+            if body is None:
+                print(f"加载报告失败 {key}: 报告不存在")
+                return None
+            return self.codec.decode_bytes(body)
+        except Exception as e:
+            print(f"加载报告失败 {key}: {e}")
+            return None
+
+    def fingerprint(self, key: str) -> Optional[Tuple[int, int]]:
+        with self.index.transaction() as conn:
+            row = conn.execute(
+                "SELECT updated_ns, length FROM segment_offsets WHERE rel_path=?", (self.index.rel_path(key),)
+            ).fetchone()
+        return (row["updated_ns"], row["length"]) if row else None
+
+    def remove(self, key: str):
+        rel = self.index.rel_path(key)
+        with self.index.transaction() as conn, self._segment_lock:
+            if conn.execute("SELECT 1 FROM segment_offsets WHERE rel_path=?", (rel,)).fetchone() is None:
+                raise FileNotFoundError(key)
+            segment, offset, length = self._append_locked(conn, self._OP_DELETE, rel, b"")
+            self._apply_record_locked(conn, segment, offset, length, self._OP_DELETE, rel, 0)
+            self.index.remove(key)
+        self._schedule_compaction()
+
+    def _rewrite_if_changed(self, key: str, date_folder: str, data: Dict,
+                            extract: MetadataExtractor) -> bool:
+        with self.index.transaction(), self._segment_lock:
+            body = self._read_body_locked(self.index.rel_path(key))
+        if body is None or body == self.codec.encode_file(data, date_folder):
+            return False
+        self.write(key, data, extract(data))
+        return True
+
+    def rebuild_index(self, extract: MetadataExtractor):
+        with self.index.transaction() as conn:
+            self.index.clear()
+            rows = conn.execute("SELECT rel_path, length, updated_ns FROM segment_offsets").fetchall()
+            for row in rows:
+                key = self.index.abs_path(row["rel_path"])
+                data = self.read(key)
+                self.index.upsert(key, extract(data) if data else None, (row["updated_ns"], row["length"], 0))
+            self.index.mark_built()
+        self._pending_reindex = []
+
+    def sync_index(self, extract: MetadataExtractor, full: bool = False) -> int:
+        # 段存储只会被本程序写入，唯一的外部变化来源是打开时重放的尾部记录
+        pending, self._pending_reindex = self._pending_reindex, []
+        for rel in dict.fromkeys(pending):
+            key = self.index.abs_path(rel)
+            fingerprint = self.fingerprint(key)
+            if fingerprint is None:
+                self.index.remove(key)
+                continue
+            data = self.read(key)
+            self.index.upsert(key, extract(data) if data else None, (*fingerprint, 0))
+        return len(pending)
+
+    def iterate(self, since: Optional[str] = None,
+                until: Optional[str] = None) -> Iterator[Tuple[str, str, Dict]]:
+        last: Tuple = ("", -1.0, "")
+        while True:
+            clauses = ["(r.date_folder, r.sort_ts, r.rel_path) > (?, ?, ?)"]
+            params: List = list(last)
+            if since:
+                clauses.append("r.date_folder >= ?")
+                params.append(since)
+            if until:
+                clauses.append("r.date_folder <= ?")
+                params.append(until)
+            with self.index.transaction() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT r.rel_path, r.date_folder, r.sort_ts
+                    FROM reports r JOIN segment_offsets o ON o.rel_path = r.rel_path
+                    WHERE {' AND '.join(clauses)}
+                    ORDER BY r.date_folder, r.sort_ts, r.rel_path
+                    LIMIT ?
+                    """,
+                    (*params, self._ITER_BATCH)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                key = self.index.abs_path(row["rel_path"])
+                data = self.read(key)
+                if data is not None:
+                    yield key, row["date_folder"], data
+            last = (rows[-1]["date_folder"], rows[-1]["sort_ts"], rows[-1]["rel_path"])
+
+    @contextmanager
+    def batch(self):
+        """同 StorageBackend.batch；批次期间不启动整理，最外层批次结束后再检查一次"""
+        with super().batch():
+            yield self
+        if not self.in_batch:
+            self._schedule_compaction()
+
+    def recompact(self, extract: MetadataExtractor,
+                  progress: Optional[Callable[[int, str], None]] = None) -> int:
+        count = super().recompact(extract, progress)
+        self.compact_segments()
+        return count
+
+    def _segments_to_compact(self) -> List[int]:
+        with self.index.transaction() as conn:
+            rows = conn.execute(
+                "SELECT segment FROM segment_files WHERE segment <> ? AND size > 0 "
+                "AND dead_bytes >= size * ? ORDER BY segment",
+                (self._active_segment, self.compact_ratio)
+            ).fetchall()
+        return [row["segment"] for row in rows]
+
+    def _schedule_compaction(self):
+        """有需要整理的旧段时启动后台整理线程（同一时间只有一个；批次进行中时留到批次结束）"""
+        if self.in_batch:
+            return
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        if not self._segments_to_compact():
+            return
+        self._compact_thread = threading.Thread(
+            target=self.compact_segments, name="segment-compaction", daemon=True
+        )
+        self._compact_thread.start()
+
+    def compact_segments(self) -> int:
+        """
+        整理失效记录占比超过阈值的旧段：存活记录复制到当前段，然后删除旧段
+
+        Returns:
+            整理的段数量
+        """
+        count = 0
+        for segment in self._segments_to_compact():
+            try:
+                if self._compact_segment(segment):
+                    count += 1
+            except Exception as e:
+                print(f"整理段文件失败 {self._segment_path(segment)}: {e}")
+        return count
+
+    def _compact_segment(self, segment: int) -> bool:
+        """
+        整理一个旧段：存活记录全部写入当前段并刷盘一次后，才提交偏移更新、删除旧段（与批次状态无关）
+
+        Returns:
+            是否整理（该段已被另一次整理删除，或处于外层事务中无法立即提交时为 False）
+        """
+        with self.index.transaction() as conn, self._segment_lock:
+            # 嵌套在外层事务中时偏移更新要等外层提交，不能先删除旧段
+            if self.index.transaction_depth != 1:
+                return False
+            if conn.execute("SELECT 1 FROM segment_files WHERE segment=?", (segment,)).fetchone() is None:
+                return False
+            first_segment = self._active_segment
+            live = {
+                row["rel_path"]: row["offset"] for row in conn.execute(
+                    "SELECT rel_path, offset FROM segment_offsets WHERE segment=?", (segment,)
+                )
+            }
+            # 更早的段仍存在时保留墓碑，避免按顺序扫描重建偏移索引时旧记录复活
+            keep_tombstones = any(n < segment for n in self._segment_numbers())
+            for offset, length, op, rel, body in self._iter_records(segment):
+                if op == self._OP_PUT and live.get(rel) == offset:
+                    new_segment, new_offset, new_length = self._append_locked(conn, op, rel, body, sync=False)
+                    # 内容不变，保留 updated_ns，报告缓存仍然有效
+                    conn.execute(
+                        "UPDATE segment_offsets SET segment=?, offset=?, length=? WHERE rel_path=?",
+                        (new_segment, new_offset, new_length, rel)
+                    )
+                elif op == self._OP_DELETE and keep_tombstones and rel not in live:
+                    new_segment, _offset, new_length = self._append_locked(conn, op, rel, body, sync=False)
+                    conn.execute("UPDATE segment_files SET dead_bytes = dead_bytes + ? WHERE segment=?",
+                                 (new_length, new_segment))
+            if self.fsync:
+                for number in range(first_segment, self._active_segment + 1):
+                    path = self._segment_path(number)
+                    if os.path.exists(path):
+                        fsync_file(path)
+                if self._active_segment != first_segment:
+                    fsync_dir(self.segment_folder)
+            conn.execute("DELETE FROM segment_files WHERE segment=?", (segment,))
+        os.remove(self._segment_path(segment))
+        return True
+
+    def close(self):
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+        super().close()
+
+
+STORAGE_BACKENDS = {
+    FolderStorage.name: FolderStorage,
+    SQLiteStorage.name: SQLiteStorage,
+    SegmentStorage.name: SegmentStorage,
+}
+
+
+def create_storage(db_path: str, config: Dict) -> StorageBackend:
+    """
+    按系统配置创建存储后端（config["database"]["storage"]，默认 folder）
+
+    Args:
+        db_path: 数据库路径
+        config: 系统配置
+
+    Returns:
+        存储后端实例
+    """
+    options = config.get("database", {})
+    kind = options.get("storage", FolderStorage.name)
+    backend_cls = STORAGE_BACKENDS.get(kind)
+    if backend_cls is None:
+        raise ValueError(f"未知的存储后端: {kind}（可选: {', '.join(STORAGE_BACKENDS)}）")
+    return backend_cls(db_path, options)
+
+
+def migrate_storage(source: StorageBackend, target: StorageBackend, extract: MetadataExtractor,
+                    index_meta: Optional[Dict[str, str]] = None,
+                    progress: Optional[Callable[[int, str], None]] = None) -> int:
+    """
+    将源后端中的所有报告复制到目标后端（保留报告键，目标中同键报告会被覆盖）
+
+    Args:
+        source: 源存储后端
+        target: 目标存储后端
+        extract: 元数据提取函数
+        index_meta: 索引所依赖的配置（如提取元数据时使用的基本信息key），记录到目标索引
+        progress: 进度回调，参数为 (已迁移数量, 报告键)
+
+    Returns:
+        迁移的报告数量
+    """
+    count = 0
+    with target.batch():
+        for key, date_folder, data in source.iterate():
+            target_key = target.new_key(date_folder, os.path.basename(key))
+            target.write(target_key, data, extract(data))
+            target.batch_checkpoint()
+            count += 1
+            if progress:
+                progress(count, target_key)
+        for key, value in (index_meta or {}).items():
+            target.index.set_meta(key, value)
+        target.index.mark_built()
+    return count
+
+
+def _add_common_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--config", default="config.json", help="系统配置文件路径")
+    parser.add_argument("--db", help="数据库路径，默认取配置中的 database.path")
+    parser.add_argument("--basic-info-key", default="基本信息",
+                        help="报告中基本信息的key，默认 基本信息")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报告存储后端工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="在存储后端之间迁移报告")
+    _add_common_arguments(migrate_parser)
+    migrate_parser.add_argument("--from", dest="source", default=None,
+                                help="源后端，默认取配置中的 database.storage")
+    migrate_parser.add_argument("--to", dest="target", required=True, choices=sorted(STORAGE_BACKENDS),
+                                help="目标后端")
+    compact_parser = subparsers.add_parser(
+        "compact", help="按 database.compact_format 配置重写已有报告（紧凑格式、冷数据压缩）"
+    )
+    _add_common_arguments(compact_parser)
+    archive_parser = subparsers.add_parser("archive", help="将早期的日期文件夹按月归档为zip（仅目录布局）")
+    _add_common_arguments(archive_parser)
+    archive_parser.add_argument("--older-than", type=int, default=None,
+                                help="归档早于该天数的日期文件夹，默认取配置中的 database.archive.archive_after_days")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    options = config.get("database", {})
+    db_path = args.db or options.get("path", "vest_database")
+
+    from data import DataManager
+    data_manager = DataManager(db_path, config)
+    extract = partial(data_manager.extract_index_metadata, basic_info_key=args.basic_info_key)
+
+    if args.command == "compact":
+        def report_compact_progress(count: int, key: str):
+            if count % 500 == 0:
+                print(f"已重写 {count} 份报告...")
+
+        storage = create_storage(db_path, config)
+        count = storage.recompact(extract, report_compact_progress)
+        storage.close()
+        print(f"整理完成：共重写 {count} 份报告")
+        return
+
+    if args.command == "archive":
+        storage = create_storage(db_path, config)
+        if not isinstance(storage, FolderStorage):
+            storage.close()
+            parser.error(f"归档仅支持 {FolderStorage.name} 存储后端，当前为 {storage.name}")
+        older_than = args.older_than
+        if older_than is None:
+            older_than = int(options.get("archive", {}).get("archive_after_days", 365))
+
+        def report_archive_progress(count: int, archive_path: str):
+            print(f"已归档 {count} 份报告（{archive_path}）")
+
+        count = storage.archive(older_than, report_archive_progress)
+        storage.close()
+        print(f"归档完成：共归档 {count} 份报告")
+        return
+
+    source_kind = args.source or options.get("storage", FolderStorage.name)
+    if source_kind == args.target:
+        parser.error("源后端与目标后端相同")
+    source = STORAGE_BACKENDS[source_kind](db_path, options)
+    target = STORAGE_BACKENDS[args.target](db_path, options)
+
+    def report_progress(count: int, key: str):
+        if count % 500 == 0:
+            print(f"已迁移 {count} 份报告...")
+
+    count = migrate_storage(source, target, extract, data_manager.index_meta(args.basic_info_key),
+                            report_progress)
+    source.close()
+    target.close()
+    print(f"迁移完成：共 {count} 份报告从 {source_kind} 迁移到 {args.target}")
+    print(f'如需切换，请将 config.json 中的 database.storage 设为 "{args.target}"')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+xlsx 直接补丁模块 - 不经过 openpyxl 的加载/修改/保存，直接改写工作表XML中的单元格值
+
+适用于坐标固定的模板（如 vestibular_full_template.json）：输出与模板只差单元格的值。
+模板包预先分析一次：定位目标工作表的XML部件，以及其中每个目标坐标的 <c> 元素的位置与样式；
+其它部件连同压缩后的数据保存为一个不含该工作表的zip前缀。每份报告只需把新的 <c> 元素拼入工作表XML，
+在前缀之后追加这一个部件即可，其它部件逐字节复制。
+
+单元格值的写法与 openpyxl 一致（字符串为 inlineStr，数字按 safe_string），
+遇到无法直接写出的值类型时抛出 UnsupportedValue，由调用方改用 openpyxl 生成。
+"""
+import io
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from xml.sax.saxutils import escape
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.compat import safe_string
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# 工作表XML中的单元格元素：<c .../> 或 <c ...>...</c>（文本中的 '<' 均已转义，不会提前匹配到 </c>）
+_CELL_RE = re.compile(rb"<c\b([^>]*?)(?:/>|>.*?</c>)", re.DOTALL)
+_CELL_REF_RE = re.compile(rb'\br="([A-Z]+[0-9]+)"')
+_CELL_STYLE_RE = re.compile(rb'\bs="([0-9]+)"')
+
+
+class UnsupportedValue(TypeError):
+    """值的类型无法直接写入XML（如日期），需要改用 openpyxl 生成"""
+
+
+def _find_sheet_part(archive, sheet_name):
+    """按工作表名称找到其XML部件路径（未指定或不存在时取第一个工作表）"""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.findall(f"{_MAIN_NS}sheets/{_MAIN_NS}sheet")
+    if not sheets:
+        raise ValueError("模板中没有工作表")
+    sheet = next((s for s in sheets if s.get("name") == sheet_name), sheets[0])
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.findall(f"{_PKG_REL_NS}Relationship"):
+        if rel.get("Id") == sheet.get(_REL_ID):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target[1:]
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"模板中找不到工作表部件: {sheet.get('name')}")
+
+
+def _cell_xml(coordinate, style, value):
+    """
+    生成单元格元素（写法同 openpyxl）
+
+    Args:
+        coordinate: 坐标（字节串），如 b'B3'
+        style: 样式属性（如 b' s="12"'），模板中没有样式时为 b''
+        value: 单元格值
+
+    Returns:
+        <c> 元素的字节串
+    """
+    head = b'<c r="' + coordinate + b'"' + style
+    if value is None:
+        return head + b' t="n" />'
+    if isinstance(value, str):
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if value == "":
+            return head + b' t="inlineStr" />'
+        if value.startswith("=") and len(value) > 1:
+            return head + b"><f>" + escape(value[1:]).encode("utf-8") + b"</f><v /></c>"
+        text = escape(value).replace("\r", "&#13;").encode("utf-8")
+        space = b' xml:space="preserve"' if value.strip() and value.strip() != value else b""
+        return head + b' t="inlineStr"><is><t' + space + b">" + text + b"</t></is></c>"
+    if isinstance(value, bool):
+        return head + b' t="b"><v>' + (b"1" if value else b"0") + b"</v></c>"
+    if isinstance(value, (int, float)):
+        return head + b' t="n"><v>' + safe_string(value).encode("ascii") + b"</v></c>"
+    raise UnsupportedValue(f"无法直接写入的值类型: {type(value).__name__}")
+
+
+class XlsxPatchTemplate:
+    """预分析的模板包：按坐标把单元格值拼入目标工作表XML，其余部件原样复制"""
+
+    def __init__(self, xlsx_bytes, sheet_name, coordinates):
+        """
+        Args:
+            xlsx_bytes: 模板文件内容（已包含合并、样式等与报告数据无关的修改）
+            sheet_name: 目标工作表名称
+            coordinates: 需要写入的坐标（如 ['B3', 'D5']），必须已存在于工作表XML中
+        """
+        with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as archive:
+            self.sheet_part = _find_sheet_part(archive, sheet_name)
+            sheet_info = archive.getinfo(self.sheet_part)
+            sheet_xml = archive.read(self.sheet_part)
+
+            prefix = io.BytesIO()
+            with zipfile.ZipFile(prefix, "w", zipfile.ZIP_DEFLATED) as out:
+                for info in archive.infolist():
+                    if info.filename != self.sheet_part:
+                        out.writestr(info, archive.read(info.filename), compress_type=info.compress_type)
+        self._prefix = prefix.getvalue()
+        self._sheet_info = zipfile.ZipInfo(self.sheet_part, date_time=sheet_info.date_time)
+        self._sheet_info.compress_type = zipfile.ZIP_DEFLATED
+
+        wanted = {c.encode("ascii") for c in coordinates}
+        found = {}
+        for match in _CELL_RE.finditer(sheet_xml):
+            ref = _CELL_REF_RE.search(match.group(1))
+            if ref is None or ref.group(1) not in wanted:
+                continue
+            style = _CELL_STYLE_RE.search(match.group(1))
+            found[ref.group(1)] = (match.start(), match.end(), b' s="' + style.group(1) + b'"' if style else b"")
+        missing = wanted - set(found)
+        if missing:
+            raise ValueError(f"工作表中缺少单元格: {', '.join(sorted(c.decode() for c in missing))}")
+
+        # 工作表XML = 片段0 + 单元格0 + 片段1 + 单元格1 + ... + 片段N
+        self._targets = []
+        self._chunks = []
+        position = 0
+        for coordinate, (start, end, style) in sorted(found.items(), key=lambda item: item[1][0]):
+            self._chunks.append(sheet_xml[position:start])
+            self._targets.append((coordinate.decode("ascii"), coordinate, style, sheet_xml[start:end]))
+            position = end
+        self._chunks.append(sheet_xml[position:])
+
+    def render(self, values):
+        """
+        生成填好值的xlsx文件内容
+
+        Args:
+            values: {坐标: 值}，不在其中的目标单元格保持模板原样
+
+        Returns:
+            xlsx文件内容
+        """
+        parts = []
+        for chunk, (coordinate, raw_coordinate, style, original) in zip(self._chunks, self._targets):
+            parts.append(chunk)
+            if coordinate in values:
+                parts.append(_cell_xml(raw_coordinate, style, values[coordinate]))
+            else:
+                parts.append(original)
+        parts.append(self._chunks[-1])
+
+        buffer = io.BytesIO()
+        buffer.write(self._prefix)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as out:
+            out.writestr(self._sheet_info, b"".join(parts))
+        return buffer.getvalue()